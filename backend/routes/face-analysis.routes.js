@@ -2,8 +2,8 @@ const express = require('express');
 const router = express.Router();
 const multer = require('multer');
 const path = require('path');
-const { spawn } = require('child_process');
 const fs = require('fs');
+const faceAnalysisWorker = require('../utils/face-analysis-worker');
 
 // Configure multer for file upload
 const storage = multer.diskStorage({
@@ -31,57 +31,33 @@ router.post('/analyze', upload.single('image'), async (req, res) => {
         }
 
         const imagePath = path.join(__dirname, '..', req.file.path);
-        
-        // Create a Python process to analyze the face
-        const python = spawn('python', [
-            path.join(__dirname, '..', 'utils', 'analyze_face.py'),
-            imagePath
-        ]);
 
-        let result = '';
-        let error = '';
-
-        python.stdout.on('data', (data) => {
-            result += data.toString();
-        });
-
-        python.stderr.on('data', (data) => {
-            error += data.toString();
-        });        python.on('close', (code) => {
+        let analysis;
+        try {
+            // Analyze the face on the long-lived Python worker
+            analysis = await faceAnalysisWorker.analyze(imagePath);
+        } catch (e) {
+            console.error('Python script error:', e.message);
+            return res.status(500).json({ 
+                error: 'Face analysis failed', 
+                details: e.message 
+            });
+        } finally {
             // Clean up the uploaded file
             fs.unlink(imagePath, (err) => {
                 if (err) console.error('Error deleting file:', err);
             });
+        }
 
-            if (code !== 0) {
-                console.error('Python script error:', error);
-                return res.status(500).json({ 
-                    error: 'Face analysis failed', 
-                    details: error.trim() 
-                });
-            }
-
-            if (!result) {
-                return res.status(500).json({ 
-                    error: 'No analysis result', 
-                    details: 'The analysis script did not return any data' 
-                });
-            }
+        if (!analysis || !analysis.face_shape) {
+            console.error('Analysis parsing error: missing face shape', 'Result:', analysis);
+            return res.status(500).json({ 
+                error: 'Invalid analysis result', 
+                details: 'Invalid analysis result: missing face shape' 
+            });
+        }
 
-            try {
-                const analysis = JSON.parse(result);
-                if (!analysis.face_shape) {
-                    throw new Error('Invalid analysis result: missing face shape');
-                }
-                res.json(analysis);
-            } catch (e) {
-                console.error('Analysis parsing error:', e, 'Result:', result);
-                res.status(500).json({ 
-                    error: 'Invalid analysis result', 
-                    details: e.message 
-                });
-            }
-        });
+        res.json(analysis);
 
     } catch (error) {
         res.status(500).json({ 
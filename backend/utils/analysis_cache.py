@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'face_analysis.sqlite'
+)
+
+# Expiry and the entry cap are enforced every this many puts, not on each
+EVICT_EVERY = 100
+
+
+def image_key(image):
+    """Content hash of a decoded image (pixels plus shape and dtype)"""
+    digest = hashlib.sha256()
+    digest.update(f"{image.shape}|{image.dtype}".encode('ascii'))
+    digest.update(memoryview(image if image.flags.c_contiguous else image.copy()).cast('B'))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier cache of analysis results keyed by image content hash
+
+    Callers prefix keys with the version of the code that produced the
+    result (face_analyzer.ANALYZER_VERSION), so older results are not served.
+
+    The first tier is an in-process LRU dict. The second is a SQLite file
+    shared by every process on the box, with TTL expiry and an entry cap
+    enforced oldest-access-first. Results must be JSON serialisable.
+
+    SQLite errors (e.g. "database is locked" with many writers) never fail
+    the caller: a failed lookup is a miss and a failed store is skipped.
+    The cap is checked every EVICT_EVERY puts, so the file can briefly hold
+    that many entries per process over it.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_entries=256,
+                 disk_entries=100000, ttl_seconds=30 * 24 * 3600):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'disk_errors': 0
+        }
+        self.puts_since_evict = 0
+
+        self.path = path
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            self.db.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+            self.db.commit()
+
+    def _disk_error(self, action, error):
+        self.stats['disk_errors'] += 1
+        print(f"Analysis cache: {action} failed: {error}", file=sys.stderr, flush=True)
+        try:
+            self.db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _expired(self, created, now):
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self.memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return json.loads(value)
+                del self.memory[key]
+
+            if self.db is not None:
+                try:
+                    value = self._get_disk(key, now)
+                except sqlite3.Error as e:
+                    self._disk_error('lookup', e)
+                    value = None
+                if value is not None:
+                    self.stats['disk_hits'] += 1
+                    return json.loads(value)
+
+            self.stats['misses'] += 1
+            return None
+
+    def _get_disk(self, key, now):
+        row = self.db.execute(
+            'SELECT value, created FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if self._expired(created, now):
+            self.db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self.db.commit()
+            return None
+        self.db.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        self.db.commit()
+        self._remember(key, created, value)
+        return value
+
+    def put(self, key, result):
+        """Store a result in both tiers"""
+        now = time.time()
+        value = json.dumps(result)
+        with self.lock:
+            self._remember(key, now, value)
+            if self.db is not None:
+                try:
+                    self.db.execute(
+                        'INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                        (key, value, now, now)
+                    )
+                    self.puts_since_evict += 1
+                    if self.puts_since_evict >= EVICT_EVERY:
+                        self._evict_disk(now)
+                        self.puts_since_evict = 0
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    self._disk_error('store', e)
+            self.stats['stores'] += 1
+
+    def _remember(self, key, created, value):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _evict_disk(self, now):
+        if self.ttl_seconds is not None:
+            cursor = self.db.execute('DELETE FROM results WHERE created < ?', (now - self.ttl_seconds,))
+            self.stats['evictions'] += cursor.rowcount
+        count = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count > self.disk_entries:
+            cursor = self.db.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM results ORDER BY accessed ASC LIMIT ?)',
+                (count - self.disk_entries,)
+            )
+            self.stats['evictions'] += cursor.rowcount
+
+    def get_stats(self):
+        """Hit/miss counters and current tier sizes"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self.memory)
+            if self.db is not None:
+                try:
+                    stats['disk_entries'] = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+                except sqlite3.Error as e:
+                    self._disk_error('count', e)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def cache_from_env():
+    """Build the cache configured by FACE_ANALYSIS_CACHE* environment variables
+
+    Set FACE_ANALYSIS_CACHE=0 to disable caching entirely, or
+    FACE_ANALYSIS_CACHE_PATH= (empty) to keep only the in-memory tier.
+    """
+    if os.environ.get('FACE_ANALYSIS_CACHE', '1') == '0':
+        return None
+    return AnalysisCache(
+        path=os.environ.get('FACE_ANALYSIS_CACHE_PATH', DEFAULT_CACHE_PATH),
+        memory_entries=int(os.environ.get('FACE_ANALYSIS_CACHE_MEMORY_ENTRIES', '256')),
+        disk_entries=int(os.environ.get('FACE_ANALYSIS_CACHE_DISK_ENTRIES', '100000')),
+        ttl_seconds=float(os.environ.get('FACE_ANALYSIS_CACHE_TTL', str(30 * 24 * 3600)))
+    )
@@ -1,19 +1,120 @@
 import sys
 import json
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from face_analyzer import FaceShapeAnalyzer
+from analysis_cache import cache_from_env
+from face_mesh_pool import FaceMeshPool
+
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class AnalysisWorker:
+    """Long-lived worker that answers NDJSON analysis jobs with one warm analyzer.
+
+    Each stdin line is a job such as ``{"id": "42", "image_path": "/tmp/a.jpg"}``
+    (or ``"image_base64"`` with the encoded image bytes instead of a path).
+    Each stdout line is the matching reply, either ``{"id": "42", "result": {...}}``
+    or ``{"id": "42", "error": "...", "details": "..."}``. Replies are written in
+    completion order, so callers must match them by id. A job of
+    ``{"id": "7", "op": "stats"}`` returns the result cache and FaceMesh
+    pool counters.
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, output=None):
+        # One warm FaceMesh graph per in-flight job
+        self.pool = FaceMeshPool(size=max_in_flight).warm()
+        self.analyzer = FaceShapeAnalyzer(cache=cache_from_env(), pool=self.pool)
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def write(self, message):
+        """Write one NDJSON message to the output stream"""
+        line = json.dumps(message)
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, job):
+        """Run a single job and write its reply"""
+        job_id = job.get('id')
+        try:
+            if job.get('op') == 'stats':
+                cache = self.analyzer.cache
+                self.write({'id': job_id, 'result': {
+                    'cache': cache.get_stats() if cache else None,
+                    'face_mesh_pool': self.pool.stats()
+                }})
+                return
+            if 'image_base64' in job:
+                image = base64.b64decode(job['image_base64'])
+            else:
+                image = job['image_path']
+            result = self.analyzer.analyze_face_shape(image)
+            self.write({'id': job_id, 'result': result})
+        except Exception as e:
+            self.write({
+                'id': job_id,
+                'error': 'Analysis failed',
+                'details': str(e)
+            })
+
+    def submit(self, line):
+        """Parse one input line and schedule it"""
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError('Job must be a JSON object')
+        except ValueError as e:
+            self.write({'id': None, 'error': 'Invalid job', 'details': str(e)})
+            return
+        self.executor.submit(self.handle, job)
+
+    def serve(self, input_stream=None):
+        """Read jobs until EOF, then wait for in-flight jobs to finish"""
+        input_stream = input_stream or sys.stdin
+        self.write({'ready': True})
+        try:
+            for line in input_stream:
+                line = line.strip()
+                if line:
+                    self.submit(line)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def run_worker(args):
+    """Start the NDJSON worker loop"""
+    max_in_flight = DEFAULT_MAX_IN_FLIGHT
+    if args:
+        try:
+            max_in_flight = max(1, int(args[0]))
+        except ValueError:
+            print(json.dumps({
+                'error': 'Invalid arguments. Usage: analyze_face.py --worker [max_in_flight]'
+            }))
+            sys.exit(1)
+    AnalysisWorker(max_in_flight=max_in_flight).serve()
+
 
 def main():
     """Main function to analyze face shape from an image"""
+    if len(sys.argv) >= 2 and sys.argv[1] == '--worker':
+        run_worker(sys.argv[2:])
+        return
+
     if len(sys.argv) != 2:
         print(json.dumps({
-            'error': 'Invalid arguments. Usage: analyze_face.py <image_path>'
+            'error': 'Invalid arguments. Usage: analyze_face.py <image_path> | --worker [max_in_flight]'
         }))
         sys.exit(1)
 
     image_path = sys.argv[1]
-    
+
     try:
-        analyzer = FaceShapeAnalyzer()
+        analyzer = FaceShapeAnalyzer(cache=cache_from_env(), pool=FaceMeshPool(size=1))
         result = analyzer.analyze_face_shape(image_path)
         print(json.dumps(result))
     except Exception as e:
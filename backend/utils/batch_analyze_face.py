@@ -0,0 +1,269 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from face_analyzer import MEASUREMENT_LANDMARKS, MEASUREMENT_RATIOS
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff'}
+
+# Derived from the analyzer's tables, so a new measurement gets a CSV column
+# instead of failing every row that carries it
+MEASUREMENT_FIELDS = list(MEASUREMENT_LANDMARKS) + list(MEASUREMENT_RATIOS)
+
+CSV_FIELDS = ['image_path', 'face_shape'] + MEASUREMENT_FIELDS + ['error', 'details']
+
+# Each pool process owns exactly one analyzer (and therefore one FaceMesh graph)
+_worker_analyzer = None
+
+
+def _init_worker():
+    """Build the per-process FaceShapeAnalyzer once"""
+    global _worker_analyzer
+    from face_analyzer import FaceShapeAnalyzer
+    from analysis_cache import cache_from_env
+    from face_mesh_pool import FaceMeshPool
+    _worker_analyzer = FaceShapeAnalyzer(cache=cache_from_env(), pool=FaceMeshPool(size=1).warm())
+
+
+def _analyze(image_path):
+    """Analyze one image inside a pool process"""
+    started = time.perf_counter()
+    record = {'image_path': image_path}
+    try:
+        record['result'] = _worker_analyzer.analyze_face_shape(image_path)
+    except Exception as e:
+        record['error'] = 'Analysis failed'
+        record['details'] = str(e)
+    return record, os.getpid(), time.perf_counter() - started
+
+
+def collect_images(inputs):
+    """Expand directories, glob patterns and @file lists into image paths"""
+    paths = []
+    for item in inputs:
+        if item.startswith('@'):
+            with open(item[1:], 'r', encoding='utf-8') as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        elif os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        paths.append(os.path.join(root, name))
+        elif glob.has_magic(item):
+            paths.extend(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+
+    # De-duplicate and sort so reruns see the same work list
+    seen = set()
+    unique = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return sorted(unique)
+
+
+def read_results(output_path, output_format):
+    """Rows of an existing output file, in file order"""
+    if not os.path.exists(output_path):
+        return []
+    with open(output_path, 'r', encoding='utf-8', newline='') as f:
+        if output_format == 'csv':
+            return list(csv.DictReader(f))
+        rows = []
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # A partially written last line from an interrupted run
+                continue
+        return rows
+
+
+def load_done(output_path, output_format, retry_errors=False):
+    """Return the image paths already recorded in an existing output file
+
+    The last row for an image decides: with retry_errors, an image whose
+    latest result is an error is not done.
+    """
+    done = set()
+    for row in read_results(output_path, output_format):
+        path = row.get('image_path')
+        if not path:
+            continue
+        if retry_errors and row.get('error'):
+            done.discard(path)
+        else:
+            done.add(path)
+    return done
+
+
+def drop_results(output_path, output_format, image_paths):
+    """Rewrite the output file without any rows for image_paths; returns rows dropped
+
+    Used before retrying, so each image keeps exactly one result. The file
+    is replaced atomically.
+    """
+    rows = read_results(output_path, output_format)
+    kept = [row for row in rows if row.get('image_path') not in image_paths]
+    if len(kept) == len(rows):
+        return 0
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        if output_format == 'csv':
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(kept)
+        else:
+            for row in kept:
+                f.write(json.dumps(row) + '\n')
+    os.replace(tmp_path, output_path)
+    return len(rows) - len(kept)
+
+
+class ResultWriter:
+    """Append results to an NDJSON or CSV file as they complete"""
+
+    def __init__(self, output_path, output_format):
+        self.output_format = output_format
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        if output_path == '-':
+            self.file = sys.stdout
+        else:
+            self.file = open(output_path, 'a', encoding='utf-8', newline='')
+        if output_format == 'csv':
+            self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if is_new:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.output_format == 'csv':
+            result = record.get('result') or {}
+            row = {
+                'image_path': record['image_path'],
+                'face_shape': result.get('face_shape', ''),
+                'error': record.get('error', ''),
+                'details': record.get('details', '')
+            }
+            row.update(result.get('measurements', {}))
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ThroughputStats:
+    """Track images/sec per pool process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.workers = {}
+
+    def add(self, pid, seconds, failed):
+        stats = self.workers.setdefault(pid, {'images': 0, 'failed': 0, 'busy_seconds': 0.0})
+        stats['images'] += 1
+        stats['failed'] += int(failed)
+        stats['busy_seconds'] += seconds
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        workers = {}
+        total = 0
+        for pid, stats in sorted(self.workers.items()):
+            total += stats['images']
+            workers[str(pid)] = {
+                'images': stats['images'],
+                'failed': stats['failed'],
+                'images_per_sec': round(stats['images'] / stats['busy_seconds'], 3)
+                if stats['busy_seconds'] else 0.0
+            }
+        return {
+            'images': total,
+            'wall_seconds': round(wall, 3),
+            'images_per_sec': round(total / wall, 3) if wall else 0.0,
+            'workers': workers
+        }
+
+
+def run_batch(image_paths, output_path, output_format='ndjson', workers=None,
+              chunksize=4, report_every=100):
+    """Analyze images on a process pool and stream results in completion order"""
+    writer = ResultWriter(output_path, output_format)
+    stats = ThroughputStats()
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context('spawn')
+    completed = 0
+
+    try:
+        with context.Pool(processes=workers, initializer=_init_worker) as pool:
+            for record, pid, seconds in pool.imap_unordered(_analyze, image_paths, chunksize):
+                writer.write(record)
+                stats.add(pid, seconds, 'error' in record)
+                completed += 1
+                if report_every and completed % report_every == 0:
+                    print(json.dumps(stats.summary()), file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+
+    return stats.summary()
+
+
+def main():
+    """Batch-classify face shapes for a directory, glob or list of images"""
+    parser = argparse.ArgumentParser(description='Batch face shape analysis')
+    parser.add_argument('inputs', nargs='+',
+                        help='Image files, directories, glob patterns or @list.txt files')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Output file (NDJSON or CSV), appended to and used for resuming')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default=None,
+                        help='Output format (defaults to the output file extension)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of analyzer processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=4,
+                        help='Images handed to a worker at a time')
+    parser.add_argument('--report-every', type=int, default=100,
+                        help='Print throughput to stderr every N images (0 disables)')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='Re-run images whose previous result was an error')
+    args = parser.parse_args()
+
+    output_format = args.format
+    if output_format is None:
+        output_format = 'csv' if args.output.lower().endswith('.csv') else 'ndjson'
+
+    image_paths = collect_images(args.inputs)
+    done = load_done(args.output, output_format, args.retry_errors) if args.output != '-' else set()
+    pending = [path for path in image_paths if path not in done]
+    retried = 0
+    if args.retry_errors and args.output != '-' and pending:
+        # Failed rows of images about to be retried would otherwise stay
+        # next to their new result
+        retried = drop_results(args.output, output_format, set(pending))
+    print(json.dumps({
+        'found': len(image_paths),
+        'skipped': len(image_paths) - len(pending),
+        'pending': len(pending),
+        'retried': retried
+    }), file=sys.stderr, flush=True)
+
+    if not pending:
+        return
+
+    summary = run_batch(pending, args.output, output_format, args.workers,
+                        args.chunksize, args.report_every)
+    print(json.dumps(summary), file=sys.stderr, flush=True)
+
+
+if __name__ == '__main__':
+    main()
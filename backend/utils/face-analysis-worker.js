@@ -0,0 +1,136 @@
+const path = require('path');
+const readline = require('readline');
+const { spawn } = require('child_process');
+
+const SCRIPT_PATH = path.join(__dirname, 'analyze_face.py');
+const MAX_IN_FLIGHT = parseInt(process.env.FACE_ANALYSIS_MAX_IN_FLIGHT || '4', 10);
+const JOB_TIMEOUT_MS = parseInt(process.env.FACE_ANALYSIS_TIMEOUT_MS || '30000', 10);
+
+// Keeps one `analyze_face.py --worker` process alive and multiplexes jobs over
+// its stdin/stdout as newline-delimited JSON, matching replies by job id.
+class FaceAnalysisWorker {
+    constructor() {
+        this.process = null;
+        this.pending = new Map();
+        this.nextId = 1;
+    }
+
+    start() {
+        if (this.process) {
+            return this.process;
+        }
+
+        const python = spawn('python', [SCRIPT_PATH, '--worker', String(MAX_IN_FLIGHT)], {
+            cwd: __dirname
+        });
+
+        readline.createInterface({ input: python.stdout }).on('line', (line) => {
+            this.handleLine(line);
+        });
+
+        python.stderr.on('data', (data) => {
+            console.error('Face analysis worker:', data.toString().trim());
+        });
+
+        python.on('error', (err) => {
+            console.error('Face analysis worker failed to start:', err);
+        });
+
+        // Writing to a dead worker raises EPIPE here; without a listener it
+        // would be an unhandled stream error and take the server down
+        python.stdin.on('error', (err) => {
+            console.error('Face analysis worker stdin error:', err.message);
+            this.discard(python, new Error(`Face analysis worker unavailable: ${err.message}`));
+        });
+
+        python.on('close', (code) => {
+            console.error('Face analysis worker exited with code:', code);
+            // A worker already discarded has had its jobs rejected; its late
+            // close must not fail the jobs of the worker that replaced it
+            if (this.process === python) {
+                this.process = null;
+                this.rejectAll(new Error(`Face analysis worker exited with code ${code}`));
+            }
+        });
+
+        this.process = python;
+        return python;
+    }
+
+    handleLine(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (e) {
+            console.error('Invalid face analysis worker output:', line);
+            return;
+        }
+
+        if (message.ready) {
+            return;
+        }
+
+        const job = this.pending.get(String(message.id));
+        if (!job) {
+            return;
+        }
+        this.pending.delete(String(message.id));
+        clearTimeout(job.timer);
+
+        if (message.error) {
+            const error = new Error(message.details || message.error);
+            error.details = message.details;
+            job.reject(error);
+        } else {
+            job.resolve(message.result);
+        }
+    }
+
+    // Forget a broken worker (the next job spawns a new one) and fail its jobs
+    discard(python, error) {
+        if (this.process !== python) {
+            return;
+        }
+        this.process = null;
+        python.kill();
+        this.rejectAll(error);
+    }
+
+    rejectAll(error) {
+        for (const job of this.pending.values()) {
+            clearTimeout(job.timer);
+            job.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    analyze(imagePath) {
+        const python = this.start();
+        const id = String(this.nextId++);
+
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('Face analysis timed out'));
+            }, JOB_TIMEOUT_MS);
+
+            this.pending.set(id, { resolve, reject, timer });
+            python.stdin.write(JSON.stringify({ id, image_path: imagePath }) + '\n', (err) => {
+                if (err && this.pending.has(id)) {
+                    this.pending.delete(id);
+                    clearTimeout(timer);
+                    reject(err);
+                }
+            });
+        });
+    }
+
+    stop() {
+        if (this.process) {
+            this.process.stdin.end();
+            this.process = null;
+        }
+    }
+}
+
+module.exports = new FaceAnalysisWorker();
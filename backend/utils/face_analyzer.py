@@ -1,149 +1,212 @@
-import cv2
 import numpy as np
-import mediapipe as mp
+from analysis_cache import image_key
+from face_mesh_detector import DEFAULT_MAX_EDGE, detect_landmarks, load_image
+from face_mesh_pool import get_face_mesh_pool
+
+# Part of every analysis cache key. Bump it whenever MEASUREMENT_LANDMARKS,
+# MEASUREMENT_RATIOS, SHAPE_RULES or FALLBACK_RULES change, so results cached
+# by an older analyzer (e.g. without temple_width) are not served.
+ANALYZER_VERSION = 2
+
+# Landmark pairs whose 2D distance defines each measurement. Adding a
+# measurement only needs a new row here; everything is computed in one gather.
+MEASUREMENT_LANDMARKS = {
+    'forehead_width': (71, 301),
+    'cheekbone_width': (137, 367),
+    'jaw_width': (172, 397),
+    'face_length': (152, 10),
+    'temple_width': (127, 356)
+}
+
+# Ratios between measurements as (numerator, denominator)
+MEASUREMENT_RATIOS = {
+    'length_to_width_ratio': ('face_length', 'cheekbone_width'),
+    'jaw_to_cheek_ratio': ('jaw_width', 'cheekbone_width'),
+    'jaw_to_forehead_ratio': ('jaw_width', 'forehead_width')
+}
+
+MEASUREMENT_NAMES = tuple(MEASUREMENT_LANDMARKS)
+_PAIR_STARTS = np.array([MEASUREMENT_LANDMARKS[name][0] for name in MEASUREMENT_NAMES])
+_PAIR_ENDS = np.array([MEASUREMENT_LANDMARKS[name][1] for name in MEASUREMENT_NAMES])
+
+
+def measure_landmarks(points):
+    """Compute every measurement and ratio for (N, 3) or stacked (B, N, 3) landmarks
+
+    Distances use the x/y coordinates only, matching the original per-pair
+    implementation. Each value in the returned dict has the batch shape of
+    ``points`` (a 0-d array for a single face).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    deltas = points[..., _PAIR_ENDS, :2] - points[..., _PAIR_STARTS, :2]
+    distances = np.sqrt(np.sum(deltas * deltas, axis=-1))
+
+    measurements = {
+        name: distances[..., i] for i, name in enumerate(MEASUREMENT_NAMES)
+    }
+    for name, (numerator, denominator) in MEASUREMENT_RATIOS.items():
+        measurements[name] = measurements[numerator] / measurements[denominator]
+    return measurements
+
+
+FACE_SHAPES = ("Round", "Oval", "Square", "Heart", "Oblong", "Triangle")
+_SHAPE_INDEX = {shape: i for i, shape in enumerate(FACE_SHAPES)}
+
+
+def _between(values, low, high):
+    return (values >= low) & (values <= high)
+
+
+# Scoring rules as (shape, points, predicate). Each predicate receives the
+# measurement columns and returns a boolean mask over all rows.
+SHAPE_RULES = [
+    # Round Face characteristics
+    ("Round", 1, lambda m: _between(m['length_to_width'], 0.9, 1.1)),
+    ("Round", 1, lambda m: _between(m['jaw_to_cheek'], 0.8, 1.0)),
+    # Oval Face characteristics
+    ("Oval", 1, lambda m: _between(m['length_to_width'], 1.25, 1.75)),
+    ("Oval", 1, lambda m: _between(m['jaw_to_cheek'], 0.65, 0.85)),
+    ("Oval", 1, lambda m: _between(m['jaw_to_forehead'], 0.65, 0.95)),
+    # Square Face characteristics
+    ("Square", 1, lambda m: _between(m['length_to_width'], 0.9, 1.2)),
+    ("Square", 1, lambda m: _between(m['jaw_to_cheek'], 0.85, 1.1)),
+    ("Square", 1, lambda m: _between(m['jaw_to_forehead'], 0.85, 1.1)),
+    # Heart Face characteristics
+    ("Heart", 1, lambda m: m['forehead_width'] > m['cheekbone_width']),
+    ("Heart", 1, lambda m: m['cheekbone_width'] > m['jaw_width']),
+    ("Heart", 1, lambda m: m['jaw_to_forehead'] < 0.8),
+    # Oblong Face characteristics
+    ("Oblong", 2, lambda m: m['length_to_width'] > 1.6),
+    ("Oblong", 1, lambda m: m['jaw_to_cheek'] >= 0.85),
+    # Triangle Face characteristics
+    ("Triangle", 1, lambda m: m['jaw_width'] > m['cheekbone_width']),
+    ("Triangle", 1, lambda m: m['cheekbone_width'] > m['forehead_width']),
+    ("Triangle", 1, lambda m: m['jaw_to_forehead'] > 1.2),
+]
+
+# Rows need at least this many points for the scored shape to win
+MIN_SHAPE_SCORE = 2
+
+# Applied in order when no shape reaches MIN_SHAPE_SCORE; the first match wins
+FALLBACK_RULES = [
+    ("Oblong", lambda m: m['length_to_width'] > 1.5),
+    ("Triangle", lambda m: (m['jaw_width'] > m['cheekbone_width']) & (m['jaw_width'] > m['forehead_width'])),
+    ("Heart", lambda m: (m['forehead_width'] > m['jaw_width']) & (m['jaw_to_forehead'] < 0.8)),
+    ("Square", lambda m: _between(m['length_to_width'], 0.9, 1.1) & _between(m['jaw_to_cheek'], 0.85, 1.1)),
+    ("Round", lambda m: _between(m['length_to_width'], 0.95, 1.05)),
+]
+FALLBACK_SHAPE = "Oval"
+
+
+def classify_face_shapes(length_to_width, jaw_to_cheek, jaw_to_forehead,
+                         forehead_width, cheekbone_width, jaw_width):
+    """Classify any number of faces at once from arrays of ratios and widths
+
+    Inputs broadcast against each other; the result is an array of shape
+    names with the broadcast shape. Ties go to the shape listed first in
+    FACE_SHAPES, exactly like the original scalar rules.
+    """
+    columns = {
+        'length_to_width': np.asarray(length_to_width, dtype=np.float64),
+        'jaw_to_cheek': np.asarray(jaw_to_cheek, dtype=np.float64),
+        'jaw_to_forehead': np.asarray(jaw_to_forehead, dtype=np.float64),
+        'forehead_width': np.asarray(forehead_width, dtype=np.float64),
+        'cheekbone_width': np.asarray(cheekbone_width, dtype=np.float64),
+        'jaw_width': np.asarray(jaw_width, dtype=np.float64)
+    }
+    shape = np.broadcast_shapes(*(column.shape for column in columns.values()))
+
+    scores = np.zeros(shape + (len(FACE_SHAPES),), dtype=np.int8)
+    for face_shape, points, rule in SHAPE_RULES:
+        scores[..., _SHAPE_INDEX[face_shape]] += points * rule(columns).astype(np.int8)
+
+    # argmax returns the first maximum, matching the scalar tie-break
+    best = np.argmax(scores, axis=-1)
+    best_score = np.max(scores, axis=-1)
+
+    fallback = np.select(
+        [np.broadcast_to(rule(columns), shape) for _, rule in FALLBACK_RULES],
+        [_SHAPE_INDEX[face_shape] for face_shape, _ in FALLBACK_RULES],
+        default=_SHAPE_INDEX[FALLBACK_SHAPE]
+    )
+
+    indices = np.where(best_score >= MIN_SHAPE_SCORE, best, fallback)
+    return np.asarray(FACE_SHAPES)[indices]
+
 
 class FaceShapeAnalyzer:
-    def __init__(self):
-        """Initialize FaceShapeAnalyzer with MediaPipe Face Mesh"""
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            min_detection_confidence=0.5
-        )
+    def __init__(self, cache=None, max_edge=DEFAULT_MAX_EDGE, pool=None):
+        """Initialize FaceShapeAnalyzer with a pool of MediaPipe Face Mesh graphs
 
-    def _get_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        return np.sqrt(
-            (point2.x - point1.x) ** 2 + 
-            (point2.y - point1.y) ** 2
-        )
+        cache is an optional AnalysisCache; repeat uploads of the same image
+        then skip FaceMesh entirely. Images are decoded no larger than
+        max_edge pixels, since only normalized landmarks are needed. pool
+        defaults to the process-wide FaceMeshPool, so concurrent calls run
+        on separate warm graphs.
+        """
+        self.cache = cache
+        self.max_edge = max_edge
+        self.pool = pool or get_face_mesh_pool()
 
-    def analyze_face_shape(self, image_path):
-        """Analyze face shape from an image"""
-        # Read image
-        image = cv2.imread(image_path)
+    def analyze_face_shape(self, image):
+        """Analyze face shape from an image
+
+        image may be a file path, encoded image bytes (or any buffer) or an
+        already-decoded BGR ndarray.
+        """
+        # Read image at bounded resolution
+        try:
+            image, _ = load_image(image, self.max_edge)
+        except OSError:
+            image = None
         if image is None:
             raise ValueError("Could not read image")
         
-        # Convert to RGB for MediaPipe
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        height, width = image.shape[:2]
+        cache_key = None
+        if self.cache is not None:
+            cache_key = f"v{ANALYZER_VERSION}:{image_key(image)}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         # Detect face landmarks
-        results = self.face_mesh.process(image_rgb)
+        with self.pool.checkout() as face_mesh:
+            points = detect_landmarks(face_mesh, image, self.max_edge)
         
-        if not results.multi_face_landmarks:
+        if points is None:
             raise ValueError("No face detected in the image")
         
-        landmarks = results.multi_face_landmarks[0].landmark
-        
-        # Extract key measurements
-        forehead_width = self._get_distance(landmarks[71], landmarks[301])
-        cheekbone_width = self._get_distance(landmarks[137], landmarks[367])
-        jaw_width = self._get_distance(landmarks[172], landmarks[397])
-        face_length = self._get_distance(landmarks[152], landmarks[10])
-        
-        # Calculate key ratios
-        length_to_width = face_length / cheekbone_width
-        jaw_to_cheek = jaw_width / cheekbone_width
-        jaw_to_forehead = jaw_width / forehead_width
+        # Extract key measurements and ratios in one vectorized pass
+        measurements = measure_landmarks(points)
         
         # Determine face shape based on ratios and measurements
         face_shape = self._determine_face_shape(
-            length_to_width,
-            jaw_to_cheek,
-            jaw_to_forehead,
-            forehead_width,
-            cheekbone_width,
-            jaw_width
+            measurements['length_to_width_ratio'],
+            measurements['jaw_to_cheek_ratio'],
+            measurements['jaw_to_forehead_ratio'],
+            measurements['forehead_width'],
+            measurements['cheekbone_width'],
+            measurements['jaw_width']
         )
         
-        return {
+        result = {
             'face_shape': face_shape,
             'measurements': {
-                'forehead_width': float(forehead_width),
-                'cheekbone_width': float(cheekbone_width),
-                'jaw_width': float(jaw_width),
-                'face_length': float(face_length),
-                'length_to_width_ratio': float(length_to_width),
-                'jaw_to_cheek_ratio': float(jaw_to_cheek),
-                'jaw_to_forehead_ratio': float(jaw_to_forehead)
+                name: float(value) for name, value in measurements.items()
             }
         }
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        return result
 
     def _determine_face_shape(self, length_to_width, jaw_to_cheek, jaw_to_forehead,
                           forehead_width, cheekbone_width, jaw_width):
         """Determine face shape based on measurements and ratios"""
-        scores = {
-            "Round": 0,
-            "Oval": 0,
-            "Square": 0,
-            "Heart": 0,
-            "Oblong": 0,
-            "Triangle": 0
-        }
-
-        # Round Face characteristics
-        if 0.9 <= length_to_width <= 1.1:
-            scores["Round"] += 1
-        if 0.8 <= jaw_to_cheek <= 1.0:
-            scores["Round"] += 1
-        
-        # Oval Face characteristics
-        if 1.25 <= length_to_width <= 1.75:
-            scores["Oval"] += 1
-        if 0.65 <= jaw_to_cheek <= 0.85:
-            scores["Oval"] += 1
-        if 0.65 <= jaw_to_forehead <= 0.95:
-            scores["Oval"] += 1
-
-        # Square Face characteristics
-        if 0.9 <= length_to_width <= 1.2:
-            scores["Square"] += 1
-        if 0.85 <= jaw_to_cheek <= 1.1:
-            scores["Square"] += 1
-        if 0.85 <= jaw_to_forehead <= 1.1:
-            scores["Square"] += 1
-
-        # Heart Face characteristics
-        if forehead_width > cheekbone_width:
-            scores["Heart"] += 1
-        if cheekbone_width > jaw_width:
-            scores["Heart"] += 1
-        if jaw_to_forehead < 0.8:
-            scores["Heart"] += 1
-
-        # Oblong Face characteristics
-        if length_to_width > 1.6:
-            scores["Oblong"] += 2
-        if jaw_to_cheek >= 0.85:
-            scores["Oblong"] += 1
-
-        # Triangle Face characteristics
-        if jaw_width > cheekbone_width:
-            scores["Triangle"] += 1
-        if cheekbone_width > forehead_width:
-            scores["Triangle"] += 1
-        if jaw_to_forehead > 1.2:
-            scores["Triangle"] += 1
-
-        # Get the shape with the highest score
-        max_score = max(scores.values())
-        if max_score >= 2:  # Require at least 2 matching characteristics
-            top_shapes = [shape for shape, score in scores.items() if score == max_score]
-            return top_shapes[0]  # Return the first shape if there's a tie
-        
-        # If no clear match with at least 2 characteristics, determine based on primary ratios
-        if length_to_width > 1.5:
-            return "Oblong"
-        elif jaw_width > cheekbone_width and jaw_width > forehead_width:
-            return "Triangle"
-        elif forehead_width > jaw_width and jaw_to_forehead < 0.8:
-            return "Heart"
-        elif 0.9 <= length_to_width <= 1.1 and 0.85 <= jaw_to_cheek <= 1.1:
-            return "Square"
-        elif 0.95 <= length_to_width <= 1.05:
-            return "Round"
-        else:
-            return "Oval"
+        return classify_face_shapes(
+            length_to_width,
+            jaw_to_cheek,
+            jaw_to_forehead,
+            forehead_width,
+            cheekbone_width,
+            jaw_width
+        ).item()
@@ -0,0 +1,143 @@
+import os
+import struct
+import cv2
+import numpy as np
+
+# FaceMesh runs its detector at 128px and the mesh at 192px, so anything
+# beyond a few hundred pixels only costs colour conversion and copying.
+DEFAULT_MAX_EDGE = int(os.environ.get('FACE_MESH_MAX_EDGE', '640'))
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+
+def probe_image_size(data):
+    """Read (width, height) from PNG or JPEG header bytes without decoding"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', bytes(data[16:24]))
+
+    if data[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                i += 1 if marker == 0xFF else 2
+                continue
+            length = struct.unpack('>H', bytes(data[i + 2:i + 4]))[0]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', bytes(data[i + 5:i + 9]))
+                return width, height
+            i += 2 + length
+    return None
+
+
+def decode_image(data, max_edge=None):
+    """Decode encoded image bytes, optionally bounded to max_edge pixels
+
+    When bounded, JPEG/PNG data is decoded with OpenCV's reduced-size
+    decoders where possible, then area-resized the rest of the way.
+    Returns (image, full_size) where full_size is the (height, width) of
+    the original image.
+    """
+    buffer = np.frombuffer(data, np.uint8)
+    size = probe_image_size(memoryview(buffer)) if max_edge else None
+
+    image = None
+    if size is not None:
+        width, height = size
+        for factor, flag in _REDUCED_FLAGS:
+            if max(width, height) // factor >= max_edge:
+                image = cv2.imdecode(buffer, flag)
+                # The decoder applies EXIF rotation, the header size does not
+                if image is not None and (image.shape[1] > image.shape[0]) != (width > height):
+                    size = (height, width)
+                break
+    if image is None:
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is None:
+            return None, None
+        size = (image.shape[1], image.shape[0])
+
+    if max_edge:
+        image, _ = fit_to_max_edge(image, max_edge)
+    return image, (size[1], size[0])
+
+
+def read_image(path, max_edge=None):
+    """Read an image file, optionally bounded to max_edge (see decode_image)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return decode_image(data, max_edge)
+
+
+def load_image(source, max_edge=None):
+    """Load a BGR image from a path, encoded bytes or an already-decoded array
+
+    source may be a str/PathLike path, any bytes-like buffer (bytes,
+    bytearray, memoryview, 1-D uint8 array) or a file-like object holding
+    encoded data, or a decoded (H, W[, C]) ndarray. Returns
+    (image, full_size) like decode_image; decoded arrays are returned
+    without copying unless they need resizing or colour conversion.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return read_image(source, max_edge)
+
+    if hasattr(source, 'read'):
+        source = source.read()
+
+    if isinstance(source, np.ndarray) and source.ndim >= 2:
+        full_size = source.shape[:2]
+        if source.ndim == 2:
+            source = cv2.cvtColor(source, cv2.COLOR_GRAY2BGR)
+        elif source.shape[2] == 4:
+            source = cv2.cvtColor(source, cv2.COLOR_BGRA2BGR)
+        if max_edge:
+            source, _ = fit_to_max_edge(source, max_edge)
+        return source, full_size
+
+    return decode_image(source, max_edge)
+
+
+def fit_to_max_edge(image, max_edge):
+    """Shrink image so its longest edge is at most max_edge; returns (image, scale)"""
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_edge or longest <= max_edge:
+        return image, 1.0
+    scale = max_edge / float(longest)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def landmarks_to_array(landmarks):
+    """Convert MediaPipe normalized landmarks into an (N, 3) float array"""
+    return np.array([(point.x, point.y, point.z) for point in landmarks], dtype=np.float64)
+
+
+def detect_landmarks(face_mesh, image, max_edge=DEFAULT_MAX_EDGE):
+    """Run FaceMesh on a bounded copy of a BGR image
+
+    Returns the first face as normalized (N, 3) landmarks, or None. Because
+    the coordinates are normalized they apply unchanged to the full-size
+    image; use landmarks_to_pixels to map them there.
+    """
+    small, _ = fit_to_max_edge(image, max_edge)
+    rgb_image = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    results = face_mesh.process(rgb_image)
+    if not results.multi_face_landmarks:
+        return None
+    return landmarks_to_array(results.multi_face_landmarks[0].landmark)
+
+
+def landmarks_to_pixels(points, image_size):
+    """Scale normalized landmarks to pixel space of an image of (height, width)"""
+    height, width = image_size
+    # MediaPipe z uses roughly the same scale as x
+    return points * np.array([width, height, width], dtype=np.float64)
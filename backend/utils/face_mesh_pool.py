@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import mediapipe as mp
+
+DEFAULT_POOL_SIZE = int(os.environ.get('FACE_MESH_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+
+DEFAULT_FACE_MESH_OPTIONS = {
+    'static_image_mode': True,
+    'max_num_faces': 1,
+    'min_detection_confidence': 0.5
+}
+
+
+class FaceMeshPool:
+    """Bounded pool of FaceMesh graphs with checkout/return semantics
+
+    A MediaPipe graph must only be used by one thread at a time, so each
+    checkout hands out a graph exclusively and returns it when the block
+    exits. Graphs are built on demand up to ``size`` (or all at once with
+    ``warm()``) and reused for the life of the pool.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, **options):
+        self.size = max(1, size)
+        self.options = dict(DEFAULT_FACE_MESH_OPTIONS)
+        self.options.update(options)
+
+        self._idle = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._in_use = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=1000)
+
+    def _create(self):
+        return mp.solutions.face_mesh.FaceMesh(**self.options)
+
+    def warm(self):
+        """Build every graph up front so the first requests do not pay for it"""
+        with self._condition:
+            missing = self.size - self._created
+            self._created = self.size
+        graphs = []
+        try:
+            for _ in range(missing):
+                graphs.append(self._create())
+        finally:
+            with self._condition:
+                # Give back the slots of graphs that failed to build, as
+                # acquire() does, so waiters can build them instead
+                self._created -= missing - len(graphs)
+                self._idle.extend(graphs)
+                self._condition.notify_all()
+        return self
+
+    def acquire(self, timeout=None):
+        """Take a graph out of the pool, building one if below size"""
+        started = time.perf_counter()
+        build = False
+        with self._condition:
+            while not self._idle:
+                if self._created < self.size:
+                    self._created += 1
+                    build = True
+                    break
+                remaining = None if timeout is None else timeout - (time.perf_counter() - started)
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError(f"No FaceMesh graph available after {timeout}s")
+                self._condition.wait(remaining)
+            face_mesh = None if build else self._idle.pop()
+            self._in_use += 1
+
+        if build:
+            try:
+                face_mesh = self._create()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+
+        waited = time.perf_counter() - started
+        with self._condition:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._recent_waits.append(waited)
+        return face_mesh
+
+    def release(self, face_mesh):
+        """Return a graph taken with acquire()"""
+        with self._condition:
+            self._idle.append(face_mesh)
+            self._in_use -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow a graph for the duration of a with-block"""
+        face_mesh = self.acquire(timeout)
+        try:
+            yield face_mesh
+        finally:
+            self.release(face_mesh)
+
+    def stats(self):
+        """Pool size, utilisation and checkout wait-time metrics in seconds"""
+        with self._condition:
+            waits = sorted(self._recent_waits)
+            stats = {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'mean_wait': self._total_wait / self._checkouts if self._checkouts else 0.0,
+                'max_wait': self._max_wait
+            }
+        stats['p95_wait'] = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        return stats
+
+    def close(self):
+        """Close the idle graphs; call once no checkouts are outstanding"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for face_mesh in idle:
+            face_mesh.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_face_mesh_pool():
+    """Process-wide pool shared by every FaceMesh user"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = FaceMeshPool()
+    return _default_pool
@@ -0,0 +1,139 @@
+import itertools
+import numpy as np
+from face_analyzer import FACE_SHAPES, classify_face_shapes
+
+
+def reference_face_shape(length_to_width, jaw_to_cheek, jaw_to_forehead,
+                         forehead_width, cheekbone_width, jaw_width):
+    """The original scalar rule chain, kept verbatim as the oracle"""
+    scores = {
+        "Round": 0,
+        "Oval": 0,
+        "Square": 0,
+        "Heart": 0,
+        "Oblong": 0,
+        "Triangle": 0
+    }
+
+    if 0.9 <= length_to_width <= 1.1:
+        scores["Round"] += 1
+    if 0.8 <= jaw_to_cheek <= 1.0:
+        scores["Round"] += 1
+
+    if 1.25 <= length_to_width <= 1.75:
+        scores["Oval"] += 1
+    if 0.65 <= jaw_to_cheek <= 0.85:
+        scores["Oval"] += 1
+    if 0.65 <= jaw_to_forehead <= 0.95:
+        scores["Oval"] += 1
+
+    if 0.9 <= length_to_width <= 1.2:
+        scores["Square"] += 1
+    if 0.85 <= jaw_to_cheek <= 1.1:
+        scores["Square"] += 1
+    if 0.85 <= jaw_to_forehead <= 1.1:
+        scores["Square"] += 1
+
+    if forehead_width > cheekbone_width:
+        scores["Heart"] += 1
+    if cheekbone_width > jaw_width:
+        scores["Heart"] += 1
+    if jaw_to_forehead < 0.8:
+        scores["Heart"] += 1
+
+    if length_to_width > 1.6:
+        scores["Oblong"] += 2
+    if jaw_to_cheek >= 0.85:
+        scores["Oblong"] += 1
+
+    if jaw_width > cheekbone_width:
+        scores["Triangle"] += 1
+    if cheekbone_width > forehead_width:
+        scores["Triangle"] += 1
+    if jaw_to_forehead > 1.2:
+        scores["Triangle"] += 1
+
+    max_score = max(scores.values())
+    if max_score >= 2:
+        top_shapes = [shape for shape, score in scores.items() if score == max_score]
+        return top_shapes[0]
+
+    if length_to_width > 1.5:
+        return "Oblong"
+    elif jaw_width > cheekbone_width and jaw_width > forehead_width:
+        return "Triangle"
+    elif forehead_width > jaw_width and jaw_to_forehead < 0.8:
+        return "Heart"
+    elif 0.9 <= length_to_width <= 1.1 and 0.85 <= jaw_to_cheek <= 1.1:
+        return "Square"
+    elif 0.95 <= length_to_width <= 1.05:
+        return "Round"
+    else:
+        return "Oval"
+
+
+def _ratio_grid(thresholds):
+    """Every threshold plus its nearest neighbours on both sides"""
+    values = set()
+    for t in thresholds:
+        values.update((np.nextafter(t, -np.inf), t, np.nextafter(t, np.inf)))
+    return sorted(values)
+
+
+def _assert_matches(rows):
+    expected = [reference_face_shape(*row) for row in rows]
+    actual = classify_face_shapes(*np.asarray(rows, dtype=np.float64).T)
+    mismatches = [
+        (row, e, a) for row, e, a in zip(rows, expected, actual) if e != a
+    ]
+    assert not mismatches, mismatches[:5]
+
+
+def test_threshold_boundaries_match_reference():
+    """Exhaustively check every rule boundary on each ratio"""
+    length_to_width = _ratio_grid([0.9, 0.95, 1.05, 1.1, 1.2, 1.25, 1.5, 1.6, 1.75])
+    jaw_to_cheek = _ratio_grid([0.65, 0.8, 0.85, 1.0, 1.1])
+    jaw_to_forehead = _ratio_grid([0.65, 0.8, 0.85, 0.95, 1.1, 1.2])
+    # Width orderings that exercise every width comparison
+    widths = list(itertools.product([0.3, 0.4, 0.5], repeat=3))
+
+    rows = [
+        (ltw, jtc, jtf, forehead, cheekbone, jaw)
+        for ltw, jtc, jtf in itertools.product(length_to_width, jaw_to_cheek, jaw_to_forehead)
+        for forehead, cheekbone, jaw in widths
+    ]
+    _assert_matches(rows)
+
+
+def test_random_measurements_match_reference():
+    """Compare on consistent ratios derived from random widths"""
+    rng = np.random.default_rng(0)
+    widths = rng.uniform(0.2, 0.8, size=(50000, 4))
+    forehead, cheekbone, jaw, length = widths.T
+    rows = np.stack([
+        length / cheekbone,
+        jaw / cheekbone,
+        jaw / forehead,
+        forehead,
+        cheekbone,
+        jaw
+    ], axis=1).tolist()
+    _assert_matches(rows)
+
+
+def test_scalar_and_batched_shapes():
+    """0-d inputs give a 0-d result and every label is a known shape"""
+    single = classify_face_shapes(1.0, 0.9, 0.9, 0.5, 0.5, 0.45)
+    assert single.shape == ()
+    assert single.item() == reference_face_shape(1.0, 0.9, 0.9, 0.5, 0.5, 0.45)
+
+    batch = classify_face_shapes(np.linspace(0.5, 2.0, 12).reshape(3, 4), 0.9, 0.9, 0.5, 0.5, 0.45)
+    assert batch.shape == (3, 4)
+    assert set(batch.ravel()) <= set(FACE_SHAPES)
+
+
+if __name__ == '__main__':
+    test_threshold_boundaries_match_reference()
+    test_random_measurements_match_reference()
+    test_scalar_and_batched_shapes()
+    print("Vectorized face shape classifier matches the scalar rules")
@@ -2,11 +2,18 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import cv2
 import numpy as np
 import io
 from pathlib import Path
 from .models.model_loader import ModelLoader
+from .models.inference_config import get_inference_config
+from .models.weight_store import get_weight_store
+from .utils.glasses_overlay import GlassesOverlay
+from .utils.resource_registry import acquire_face_mesh_pool, get_registry
+from .utils.asset_cache import get_asset_cache
+from .utils.sprite_cache import get_sprite_cache
 
 app = FastAPI(
     title="Virtual Glasses API",
@@ -26,19 +33,36 @@ app.add_middleware(
 # Initialize model loader
 model_loader = ModelLoader()
 
+# One overlay for all requests; it borrows FaceMesh graphs from the shared pool
+face_mesh_pool = acquire_face_mesh_pool()
+glasses_overlay = GlassesOverlay(pool=face_mesh_pool)
+
 @app.on_event("startup")
 async def startup_event():
     """Load models on startup"""
     success = await model_loader.load_models()
     if not success:
         print("Failed to load models during startup!")
+    
+    # Build the FaceMesh graphs before the first request arrives
+    await run_in_threadpool(face_mesh_pool.warm)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "models_loaded": model_loader.models_loaded
+        "models_loaded": model_loader.models_loaded,
+        "generator_backend": model_loader.backend,
+        "generator_precision": model_loader.precision,
+        "inference_config": get_inference_config().settings(),
+        "inference_scheduler": model_loader.scheduler.stats() if model_loader.scheduler else None,
+        "request_memory": model_loader.request_memory,
+        "face_mesh_pool": face_mesh_pool.stats(),
+        "asset_cache": get_asset_cache().stats(),
+        "sprite_cache": get_sprite_cache().stats(),
+        "weight_store": get_weight_store().stats(),
+        "resources": get_registry().stats()
     }
 
 @app.post("/process-image/")
@@ -60,12 +84,6 @@ async def process_image(file: UploadFile = File(...), glasses_id: str = None):
                 detail="Invalid image file"
             )
             
-        # Save temporary file for processing
-        temp_dir = Path("temp")
-        temp_dir.mkdir(exist_ok=True)
-        temp_path = temp_dir / file.filename
-        cv2.imwrite(str(temp_path), img)
-        
         # Get glasses path if ID provided
         glasses_path = None
         if glasses_id:
@@ -74,15 +92,9 @@ async def process_image(file: UploadFile = File(...), glasses_id: str = None):
             if potential_path.exists():
                 glasses_path = str(potential_path)
         
-        # Process the image with our new overlay
-        from app.utils.glasses_overlay import GlassesOverlay
-        overlay = GlassesOverlay()
-        try:
-            result_img = overlay.process_image(str(temp_path), glasses_path)
-        finally:
-            # Clean up temp file
-            if temp_path.exists():
-                temp_path.unlink()
+        # Process the decoded image in memory on a worker thread, so
+        # concurrent requests run in parallel on pooled FaceMesh graphs
+        result_img = await run_in_threadpool(glasses_overlay.process_image, img, glasses_path)
         
         # Convert the result image to bytes
         _, encoded_img = cv2.imencode('.png', result_img)
@@ -0,0 +1,42 @@
+import os
+import hashlib
+import threading
+from pathlib import Path
+
+# Derived model artifacts (frozen TorchScript, ONNX) are build outputs and
+# live next to the checkpoints. This module must not import torch, so that
+# torch-free runtimes can locate their artifacts.
+DEFAULT_ARTIFACT_DIR = Path(__file__).parent.parent.parent / "frozen_models"
+
+# GENERATOR_BACKEND=onnx runs the generators without torch
+GENERATOR_BACKEND = os.environ.get('GENERATOR_BACKEND', 'torch')
+
+
+# sha256 per (path, mtime_ns, size): a checkpoint is hashed once per
+# process (and once per pre-fork master) rather than on every load
+_hash_cache = {}
+_hash_cache_lock = threading.Lock()
+
+
+def checkpoint_hash(checkpoint_path):
+    """sha256 of a checkpoint file, which keys its derived artifacts"""
+    stat = os.stat(checkpoint_path)
+    key = (os.path.abspath(checkpoint_path), stat.st_mtime_ns, stat.st_size)
+    with _hash_cache_lock:
+        cached = _hash_cache.get(key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(checkpoint_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    with _hash_cache_lock:
+        _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
+def artifact_path_for(checkpoint_path, suffix, artifact_dir=DEFAULT_ARTIFACT_DIR, digest=None):
+    """Where the artifact with the given suffix of a checkpoint lives"""
+    digest = digest or checkpoint_hash(checkpoint_path)
+    return Path(artifact_dir) / f"{Path(checkpoint_path).stem}-{digest[:16]}{suffix}"
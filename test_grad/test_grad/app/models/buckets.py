@@ -0,0 +1,53 @@
+import os
+import numpy as np
+
+# Generator inputs are padded up to a small set of bucket shapes so that
+# requests with different aspect ratios share batches and oneDNN reuses
+# the primitives it built for each shape; the padding is cropped off the
+# outputs. Off unless INFERENCE_BUCKETING=1: the padding changes outputs
+# near the padded edges (~33 dB PSNR against an unpadded pass) and was ~6%
+# slower single-threaded (benchmark_buckets.py). INFERENCE_BUCKET_STEP sets
+# the bucket granularity (a multiple of 4: the generators downsample twice).
+DEFAULT_BUCKETING = os.environ.get('INFERENCE_BUCKETING', '0') == '1'
+DEFAULT_BUCKET_STEP = int(os.environ.get('INFERENCE_BUCKET_STEP', '64'))
+
+SIZE_MULTIPLE = 4
+
+
+def bucket_shape(height, width, step=DEFAULT_BUCKET_STEP):
+    """(height, width) rounded up to the bucket grid
+
+    After Resize(256) the short side is 256 and the long side varies with
+    the aspect ratio, so 4:3, 3:2 and 16:9 photos land in 256x384, 256x384
+    and 256x512 (or the transposes) with the default 64 px step.
+    """
+    if step % SIZE_MULTIPLE:
+        raise ValueError(f"Bucket step must be a multiple of {SIZE_MULTIPLE}, got {step}")
+    return -(-height // step) * step, -(-width // step) * step
+
+
+def pad_to_shape(batch, height, width):
+    """Reflect-pad an (N, C, H, W) numpy array or torch tensor on the bottom/right"""
+    pad_h = height - batch.shape[-2]
+    pad_w = width - batch.shape[-1]
+    if not pad_h and not pad_w:
+        return batch
+    # Reflection needs the pad to be smaller than the side it mirrors
+    reflect = pad_h < batch.shape[-2] and pad_w < batch.shape[-1]
+    if isinstance(batch, np.ndarray):
+        return np.pad(batch, ((0, 0), (0, 0), (0, pad_h), (0, pad_w)),
+                      mode='reflect' if reflect else 'edge')
+    import torch.nn.functional as F
+    return F.pad(batch, (0, pad_w, 0, pad_h), mode='reflect' if reflect else 'replicate')
+
+
+def to_bucket(batch, step=DEFAULT_BUCKET_STEP):
+    """Pad a batch to its bucket; returns (padded batch, original (height, width))"""
+    height, width = batch.shape[-2:]
+    return pad_to_shape(batch, *bucket_shape(height, width, step)), (height, width)
+
+
+def crop(output, size):
+    """Cut an output back to the (height, width) its input had before padding"""
+    height, width = size
+    return output[..., :height, :width]
@@ -0,0 +1,95 @@
+import os
+import sys
+from pathlib import Path
+import torch
+from .artifacts import DEFAULT_ARTIFACT_DIR, artifact_path_for as _artifact_path_for
+from .weight_store import load_weights
+
+# FROZEN_GENERATOR=0 forces the eager modules even when an artifact exists
+USE_FROZEN = os.environ.get('FROZEN_GENERATOR', '1') != '0'
+
+EXAMPLE_SHAPE = (1, 3, 256, 256)
+
+
+def artifact_path_for(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR, digest=None):
+    """Where the frozen artifact of a checkpoint lives"""
+    return _artifact_path_for(checkpoint_path, '.frozen.pt', artifact_dir, digest)
+
+
+def freeze_module(model, example_shape=EXAMPLE_SHAPE):
+    """Trace an eval-mode generator and freeze its weights into the graph
+
+    The generators are purely convolutional, so the traced graph is valid
+    for any input size, not just example_shape.
+    """
+    model = model.eval()
+    example = torch.randn(*example_shape)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.freeze(traced)
+
+
+def build_frozen_generator(checkpoint_path, model_factory=None, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Freeze the generator stored in checkpoint_path and save it; returns the artifact path"""
+    if model_factory is None:
+        from .model_loader import ModelArchitecture
+        model_factory = ModelArchitecture
+
+    model = model_factory()
+    load_weights(model, checkpoint_path)
+    frozen = freeze_module(model)
+
+    path = artifact_path_for(checkpoint_path, artifact_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Save under a temporary name so a crashed build never leaves a
+    # truncated artifact behind
+    tmp_path = path.with_suffix('.tmp')
+    torch.jit.save(frozen, str(tmp_path))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_frozen_generator(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Load the frozen artifact matching the checkpoint's current contents, or None
+
+    optimize_for_inference runs here rather than at build time: the oneDNN
+    constants it inserts cannot be serialized, and the pass only takes a
+    fraction of a second. torch.jit.load reads the weights into private
+    memory, so unlike the eager path they are not shared between processes.
+    """
+    if not Path(artifact_dir).is_dir():
+        # Nothing built yet; skip hashing the checkpoint
+        return None
+    path = artifact_path_for(checkpoint_path, artifact_dir)
+    if not path.exists():
+        return None
+    frozen = torch.jit.load(str(path), map_location='cpu')
+    return torch.jit.optimize_for_inference(frozen)
+
+
+def load_generator(checkpoint_path, model_factory, device='cpu', artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Load a generator for inference, preferring its frozen artifact on CPU
+
+    Returns (model, frozen). The frozen graph is optimized for CPU, so other
+    devices and FROZEN_GENERATOR=0 always get the eager module.
+    """
+    device = torch.device(device)
+    if USE_FROZEN and device.type == 'cpu':
+        try:
+            frozen = load_frozen_generator(checkpoint_path, artifact_dir)
+        except Exception as e:
+            print(f"Could not load frozen generator, using eager model: {e}")
+            frozen = None
+        if frozen is not None:
+            print(f"Using frozen generator for {checkpoint_path}")
+            return frozen, True
+
+    model = load_weights(model_factory(), checkpoint_path, device)
+    model.eval()
+    return model, False
+
+
+if __name__ == "__main__":
+    checkpoints = sys.argv[1:] or [str(Path(__file__).parent.parent.parent / '83_net_G_A.pth')]
+    for checkpoint in checkpoints:
+        print(f"Frozen {checkpoint} -> {build_frozen_generator(checkpoint)}")
@@ -0,0 +1,178 @@
+import os
+import time
+import json
+import threading
+import torch
+from .weight_store import shares_weights
+
+# INFERENCE_THREADS: 'auto' (time warm-up passes) or a fixed intra-op count
+# INFERENCE_CHANNELS_LAST: 'auto', '1' or '0'
+# INFERENCE_WORKERS / WEB_CONCURRENCY: worker processes sharing the box
+DEFAULT_THREADS = os.environ.get('INFERENCE_THREADS', 'auto')
+DEFAULT_CHANNELS_LAST = os.environ.get('INFERENCE_CHANNELS_LAST', 'auto')
+DEFAULT_INTEROP_THREADS = int(os.environ.get('INFERENCE_INTEROP_THREADS', '1'))
+SETTINGS_FILE = os.environ.get('INFERENCE_SETTINGS_FILE')
+
+AUTOTUNE_SHAPE = (1, 3, 128, 128)
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count():
+    return max(1, int(os.environ.get('INFERENCE_WORKERS') or os.environ.get('WEB_CONCURRENCY') or 1))
+
+
+def thread_candidates(budget):
+    """Powers of two up to the per-worker core budget, plus the budget itself"""
+    candidates = {budget}
+    n = 1
+    while n < budget:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+class InferenceConfig:
+    """Process-wide CPU inference settings: threads, memory format, grad mode
+
+    Intra-op threads default to this worker's share of the cores, so several
+    workers on one box do not oversubscribe them. With ``threads='auto'`` the
+    count (and whether channels_last pays off) is picked by timing warm-up
+    passes of the first model that is prepared.
+    """
+
+    def __init__(self, threads=DEFAULT_THREADS, channels_last=DEFAULT_CHANNELS_LAST,
+                 interop_threads=DEFAULT_INTEROP_THREADS):
+        self.cores = available_cores()
+        self.workers = worker_count()
+        self.budget = max(1, self.cores // self.workers)
+        self.requested_threads = str(threads)
+        self.requested_channels_last = str(channels_last)
+        self.interop_threads = interop_threads
+
+        self.threads = self.budget if self.requested_threads == 'auto' else int(threads)
+        self.channels_last = self.requested_channels_last == '1'
+        self.tuned = False
+        self.timings = {}
+        self.lock = threading.Lock()
+        self.apply()
+
+    def apply(self):
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel work
+            pass
+
+    @property
+    def memory_format(self):
+        return torch.channels_last if self.channels_last else torch.contiguous_format
+
+    def _time(self, model, x, repeats):
+        with torch.inference_mode():
+            model(x)
+            started = time.perf_counter()
+            for _ in range(repeats):
+                model(x)
+        return (time.perf_counter() - started) / repeats
+
+    def autotune(self, model, example_shape=AUTOTUNE_SHAPE, repeats=2):
+        """Time warm-up passes per thread count (and memory format); keep the fastest
+
+        A candidate with fewer threads wins unless a larger one is more than
+        5% faster, leaving cores free for request handling.
+
+        Converting to channels_last rewrites every weight into a private
+        tensor, which undoes the page sharing of memory-mapped weights
+        (weight_store). For such models 'auto' only tunes threads and keeps
+        the contiguous layout; INFERENCE_CHANNELS_LAST=1 opts in to
+        channels_last at the cost of one weight copy per worker.
+        """
+        if self.requested_channels_last == 'auto' and not shares_weights(model):
+            formats = [False, True]
+        else:
+            formats = [self.channels_last]
+        threads = thread_candidates(self.budget) if self.requested_threads == 'auto' else [self.threads]
+        x = torch.randn(*example_shape)
+
+        best = None
+        for channels_last in formats:
+            memory_format = torch.channels_last if channels_last else torch.contiguous_format
+            candidate_model = model.to(memory_format=memory_format)
+            candidate_x = x.contiguous(memory_format=memory_format)
+            for n in threads:
+                torch.set_num_threads(n)
+                seconds = self._time(candidate_model, candidate_x, repeats)
+                self.timings[f"{'channels_last' if channels_last else 'contiguous'}/{n}"] = seconds * 1000
+                if best is None or seconds < best[0] * 0.95:
+                    best = (seconds, n, channels_last)
+
+        _, self.threads, self.channels_last = best
+        self.tuned = True
+        self.apply()
+        model.to(memory_format=self.memory_format_for(model))
+
+    def memory_format_for(self, model):
+        """The tuned memory format, unless it would copy shared weights the caller did not opt in to"""
+        if self.channels_last and self.requested_channels_last != '1' and shares_weights(model):
+            return torch.contiguous_format
+        return self.memory_format
+
+    def prepare(self, model):
+        """Apply the settings to a generator; returns the memory format for its inputs
+
+        Only eager modules are converted or autotuned: TorchScript artifacts
+        (frozen, int8) already carry their own layouts, and ONNX runtimes
+        manage their own threads.
+        """
+        if not isinstance(model, torch.nn.Module) or isinstance(model, torch.jit.ScriptModule):
+            return None
+        with self.lock:
+            if not self.tuned and ('auto' in (self.requested_threads, self.requested_channels_last)):
+                self.autotune(model)
+                self.log()
+                self.export()
+            memory_format = self.memory_format_for(model)
+            model.to(memory_format=memory_format)
+        return memory_format
+
+    def settings(self):
+        return {
+            'threads': self.threads,
+            'interop_threads': torch.get_num_interop_threads(),
+            'channels_last': self.channels_last,
+            'inference_mode': True,
+            'cores': self.cores,
+            'workers': self.workers,
+            'autotuned': self.tuned,
+            'autotune_ms': {k: round(v, 2) for k, v in self.timings.items()}
+        }
+
+    def log(self):
+        print(f"Inference settings: {json.dumps(self.settings())}")
+
+    def export(self, path=SETTINGS_FILE):
+        """Write the chosen settings as JSON when INFERENCE_SETTINGS_FILE is set"""
+        if path:
+            with open(path, 'w') as f:
+                json.dump(self.settings(), f, indent=2)
+
+
+_default_config = None
+_default_config_lock = threading.Lock()
+
+
+def get_inference_config():
+    """Process-wide inference settings shared by every generator"""
+    global _default_config
+    if _default_config is None:
+        with _default_config_lock:
+            if _default_config is None:
+                _default_config = InferenceConfig()
+    return _default_config
@@ -1,11 +1,17 @@
 # model_loader.py
 import torch
 import os
+import logging
+import threading
 from pathlib import Path
-import cv2
-import numpy as np
-from PIL import Image
-import torchvision.transforms as transforms
+from .batch_scheduler import InferenceScheduler
+from .tensor_io import bgr_to_tensor, nchw_to_bgr
+from .tiled_inference import PeakRSS, TiledGenerator
+from .inference_config import get_inference_config
+from .artifacts import GENERATOR_BACKEND
+from ..utils.resource_registry import acquire_generator, generator_name, get_registry
+
+logger = logging.getLogger(__name__)
 
 class ModelArchitecture(torch.nn.Module):
     """Model architecture matching your trained models"""
@@ -70,9 +76,26 @@ class ModelArchitecture(torch.nn.Module):
         return self.model(x)
 
 class ModelLoader:
-    def __init__(self):
+    def __init__(self, backend=None, precision=None):
+        # 'torch' (eager or frozen TorchScript) or 'onnx'
+        self.backend = backend or GENERATOR_BACKEND
+        # Torch backend only: 'fp32', 'int8' or 'bf16'; set to what is in use after loading
+        self.precision = precision
         self.models = {}
         self.models_loaded = False
+        # Concurrent G_A calls are batched through this once models are loaded
+        self.scheduler = None
+        self.memory_format = None
+        self.tiler = None
+        # Peak RSS of the last and largest process_image calls, in MB. Only
+        # requests that ran alone are measured (see PeakRSS)
+        self.request_memory = {'requests': 0, 'last_peak_rss_mb': None, 'max_peak_rss_mb': None,
+                               'skipped_concurrent': 0}
+        self._in_flight = 0
+        self._overlaps = 0
+        self._memory_lock = threading.Lock()
+        # Registry name of the acquired G_A
+        self.resource_name = None
         base_path = Path(__file__).parent.parent.parent
         self.model_paths = {
             'G_A': str(base_path / '83_net_G_A.pth'),
@@ -81,85 +104,123 @@ class ModelLoader:
             'D_B': str(base_path / '83_net_D_B.pth')
         }
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.transform = self._get_transform()
-    
-    def _get_transform(self):
-        """Get image transformation pipeline"""
-        return transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
     
     async def load_models(self):
-        """Load all PyTorch models"""
+        """Load all PyTorch models
+
+        Weights already loaded (by a pre-fork master, see app/prefork.py)
+        are kept; only the per-process scheduler thread is started.
+        """
         try:
-            print(f"Loading models on device: {self.device}")
-            
-            # Load Generator A (main model for adding glasses)
-            print(f"Loading G_A from {self.model_paths['G_A']}")
-            model = ModelArchitecture().to(self.device)
-            state_dict = torch.load(self.model_paths['G_A'], map_location=self.device)
-            model.load_state_dict(state_dict)
-            model.eval()
-            self.models['G_A'] = model
-            
+            if 'G_A' not in self.models:
+                self.load_weights()
+            self.start_scheduler()
             self.models_loaded = True
             return True
         except Exception as e:
-            print(f"Error loading models: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception(f"Error loading models: {str(e)}")
             return False
-            
+
+    def load_weights(self):
+        """Load the generator weights without starting any threads"""
+        # Load Generator A (main model for adding glasses)
+        logger.info(f"Loading G_A from {self.model_paths['G_A']} on {self.device}")
+        # Shared through the resource registry with any other G_A user in
+        # the process. fp32 uses the frozen TorchScript artifact when built;
+        # int8 is calibrated and cached on first use
+        self.resource_name = generator_name(
+            self.model_paths['G_A'], self.backend, self.precision, self.device
+        )
+        model, precision = acquire_generator(
+            self.model_paths['G_A'], ModelArchitecture, self.backend, self.precision, self.device
+        )
+        if self.backend == 'onnx':
+            logger.info(f"G_A running on ONNX ({model.runtime})")
+        else:
+            self.precision = precision
+            logger.info(f"G_A running in {self.precision}")
+        self.models['G_A'] = model
+
+        # Threads and memory format (autotuned on the first eager model)
+        self.memory_format = get_inference_config().prepare(model)
+
+        # Inputs too large for the memory budget run tile by tile
+        self.tiler = TiledGenerator(model, memory_format=self.memory_format, device=self.device)
+
+    def start_scheduler(self):
+        """Start batching G_A calls; threads do not survive fork, so each worker starts its own"""
+        if self.scheduler is None:
+            self.scheduler = InferenceScheduler(self.models['G_A'], name='G_A',
+                                                memory_format=self.memory_format)
+
+    def stop_scheduler(self):
+        """Finish queued calls and stop the scheduler thread (before forking)"""
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+        self.models_loaded = False
+
+    def unload(self):
+        """Drop the loaded weights so the next load_models() reads them again"""
+        self.stop_scheduler()
+        self.models.clear()
+        if self.resource_name is not None:
+            get_registry().release(self.resource_name)
+            get_registry().unload(self.resource_name)
+            self.resource_name = None
+
+    def _begin_request(self):
+        """Count a request in; returns (measure, overlaps seen so far)"""
+        with self._memory_lock:
+            alone = self._in_flight == 0
+            if not alone:
+                self._overlaps += 1
+            self._in_flight += 1
+            return alone, self._overlaps
+
+    def _end_request(self, memory, overlaps):
+        """Record the request's peak RSS unless another request overlapped it"""
+        with self._memory_lock:
+            self._in_flight -= 1
+            stats = self.request_memory
+            if not memory.enabled or self._overlaps != overlaps:
+                # Another request reset or added to the process-wide peak
+                stats['skipped_concurrent'] += 1
+                return
+            if memory.peak_mb is None:
+                return
+            stats['requests'] += 1
+            stats['last_peak_rss_mb'] = round(memory.peak_mb, 1)
+            stats['max_peak_rss_mb'] = round(max(memory.peak_mb, stats['max_peak_rss_mb'] or 0), 1)
+        logger.debug(f"Peak RSS: {memory.peak_mb:.0f} MB (+{memory.delta_mb:.0f} MB during the request)")
+
     def process_image(self, image):
         """Process an image through the model"""
         if not self.models_loaded:
             raise RuntimeError("Models not loaded")
             
+        measure, overlaps = self._begin_request()
+        memory = PeakRSS(enabled=measure)
         try:
-            print(f"Processing image with shape: {image.shape}")
-            with torch.no_grad():
-                # Convert BGR to RGB
-                print("Converting BGR to RGB...")
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                
-                # Convert to PIL Image
-                print("Converting to PIL Image...")
-                pil_image = Image.fromarray(image_rgb)
-                
-                # Transform image
-                print("Applying image transformations...")
-                input_tensor = self.transform(pil_image)
-                input_tensor = input_tensor.unsqueeze(0).to(self.device)
-                print(f"Input tensor shape: {input_tensor.shape}")
-                
-                # Process through model
-                print("Running model inference...")
-                output_tensor = self.models['G_A'](input_tensor)
-                print(f"Output tensor shape: {output_tensor.shape}")
-                
-                # Convert back to image
-                print("Converting output tensor to image...")
-                output_tensor = output_tensor.cpu().squeeze()
-                output_tensor = (output_tensor + 1) / 2.0
-                output_tensor = torch.clamp(output_tensor, 0, 1)
-                
-                # Convert to numpy array
-                output_array = output_tensor.permute(1, 2, 0).numpy()
-                print(f"Output array shape: {output_array.shape}")
-                
-                # Scale to [0, 255]
-                output_array = (output_array * 255).astype(np.uint8)
+            with torch.inference_mode(), memory:
+                # BGR uint8 -> normalized RGB NCHW in one pass
+                input_tensor = bgr_to_tensor(image)
                 
-                # Convert RGB to BGR
-                print("Converting RGB to BGR for final output...")
-                output_bgr = cv2.cvtColor(output_array, cv2.COLOR_RGB2BGR)
-                print(f"Final output shape: {output_bgr.shape}")
+                if self.tiler.needs_tiling(*image.shape[:2]):
+                    # Too large for one pass within the memory budget
+                    logger.debug(f"Tiling {image.shape[1]}x{image.shape[0]} input "
+                                 f"({self.tiler.tile_size}px tiles)")
+                    output_tensor = self.tiler(input_tensor)
+                else:
+                    # Process through model, batched with concurrent requests
+                    output_tensor = self.scheduler.infer(input_tensor.to(self.device))
                 
-                return output_bgr
+                # Scale, clamp and flip back to BGR uint8 in one pass
+                output_bgr = nchw_to_bgr(output_tensor)
+            return output_bgr
                 
         except Exception as e:
-            print(f"Error processing image: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            raise
\ No newline at end of file
+            logger.exception(f"Error processing image: {str(e)}")
+            raise
+        finally:
+            self._end_request(memory, overlaps)
\ No newline at end of file
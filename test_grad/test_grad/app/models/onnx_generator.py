@@ -0,0 +1,139 @@
+import sys
+from pathlib import Path
+import cv2
+import numpy as np
+from .artifacts import DEFAULT_ARTIFACT_DIR, artifact_path_for as _artifact_path_for
+from .tensor_io import bgr_to_nchw
+
+# Nothing in this module imports torch at load time: the runtime only needs
+# numpy, OpenCV, PIL and (optionally) onnxruntime. Exporting needs torch.
+
+ONNX_OPSET = 17
+
+
+def onnx_path_for(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR, digest=None):
+    """Where the ONNX export of a checkpoint lives"""
+    return _artifact_path_for(checkpoint_path, '.onnx', artifact_dir, digest)
+
+
+def export_onnx(checkpoint_path, model_factory=None, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Export the generator in checkpoint_path to ONNX; returns the file path
+
+    Batch, height and width are dynamic axes. Requires torch and onnx.
+    """
+    import torch
+    from .weight_store import load_weights
+    if model_factory is None:
+        from .resnet_generator import ResnetGenerator
+        model_factory = ResnetGenerator
+
+    model = model_factory()
+    load_weights(model, checkpoint_path)
+    model.eval()
+
+    path = onnx_path_for(checkpoint_path, artifact_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    dynamic_axes = {0: 'batch', 2: 'height', 3: 'width'}
+    torch.onnx.export(
+        model, (torch.randn(1, 3, 256, 256),), str(tmp_path),
+        input_names=['input'], output_names=['output'],
+        dynamic_axes={'input': dynamic_axes, 'output': dynamic_axes},
+        opset_version=ONNX_OPSET, dynamo=False
+    )
+    tmp_path.replace(path)
+    return path
+
+
+class OnnxGenerator:
+    """Generator running from an ONNX file via onnxruntime or cv2.dnn
+
+    Call it with a float32 NCHW array in [-1, 1] to get the output array.
+    Torch tensors are accepted too (and a tensor is returned), so it can
+    stand in for the torch module behind an InferenceScheduler.
+    """
+
+    def __init__(self, onnx_path, runtime=None):
+        self.onnx_path = str(onnx_path)
+        if runtime is None:
+            try:
+                import onnxruntime  # noqa: F401
+                runtime = 'onnxruntime'
+            except ImportError:
+                runtime = 'cv2'
+        self.runtime = runtime
+
+        if runtime == 'onnxruntime':
+            import onnxruntime
+            self.session = onnxruntime.InferenceSession(
+                self.onnx_path, providers=['CPUExecutionProvider']
+            )
+            self.input_name = self.session.get_inputs()[0].name
+        elif runtime == 'cv2':
+            self.net = cv2.dnn.readNetFromONNX(self.onnx_path)
+        else:
+            raise ValueError(f"Unknown ONNX runtime: {runtime}")
+
+    def run(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.runtime == 'onnxruntime':
+            return self.session.run(None, {self.input_name: batch})[0]
+        # cv2.dnn.Net is not thread-safe; the InferenceScheduler already
+        # serialises calls, direct callers must not share one instance
+        self.net.setInput(batch)
+        return self.net.forward()
+
+    def __call__(self, batch):
+        if isinstance(batch, np.ndarray):
+            return self.run(batch)
+        import torch
+        return torch.from_numpy(self.run(batch.detach().cpu().numpy()))
+
+    def eval(self):
+        return self
+
+
+def load_onnx_generator(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR, runtime=None):
+    """OnnxGenerator for the checkpoint's current contents, or None if not exported"""
+    path = onnx_path_for(checkpoint_path, artifact_dir)
+    if not path.exists():
+        return None
+    return OnnxGenerator(path, runtime)
+
+
+def resize_short_side(image, size=256):
+    """Resize so the shorter side equals size, exactly as torchvision's Resize(size)
+
+    torchvision resizes PIL images with PIL's bilinear filter, so PIL (not
+    cv2.resize, whose downscaling differs) is used to keep outputs identical.
+    """
+    from PIL import Image
+    height, width = image.shape[:2]
+    if height <= width:
+        new_size = (int(size * width / height), size)
+    else:
+        new_size = (size, int(size * height / width))
+    if new_size == (width, height):
+        return image
+    return np.asarray(Image.fromarray(image).resize(new_size, Image.BILINEAR))
+
+
+def to_input(image_bgr, size=256):
+    """BGR uint8 image -> (1, 3, H, W) float32 in [-1, 1], resized like Resize(size)"""
+    if size:
+        image_bgr = resize_short_side(image_bgr, size)
+    return bgr_to_nchw(image_bgr)
+
+
+def to_image(output):
+    """(1, 3, H, W) or (3, H, W) generator output -> RGB uint8 image"""
+    if output.ndim == 4:
+        output = output[0]
+    image = (np.transpose(output, (1, 2, 0)) + 1) / 2.0 * 255.0
+    return image.astype(np.uint8)
+
+
+if __name__ == "__main__":
+    checkpoints = sys.argv[1:] or [str(Path(__file__).parent.parent.parent / '83_net_G_A.pth')]
+    for checkpoint in checkpoints:
+        print(f"Exported {checkpoint} -> {export_onnx(checkpoint)}")
@@ -0,0 +1,142 @@
+import os
+import copy
+from pathlib import Path
+import cv2
+import torch
+from .artifacts import DEFAULT_ARTIFACT_DIR, artifact_path_for
+from .frozen_generator import load_generator
+from .onnx_generator import resize_short_side
+from .tensor_io import bgr_to_tensor
+from .weight_store import load_weights
+
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+# GENERATOR_PRECISION selects the default for ModelLoader/GlassesStyleTransfer
+DEFAULT_PRECISION = os.environ.get('GENERATOR_PRECISION', 'fp32')
+
+DEFAULT_CALIBRATION_DIR = Path(__file__).parent.parent.parent / "test_images"
+CALIBRATION_IMAGES = int(os.environ.get('INT8_CALIBRATION_IMAGES', '16'))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def bf16_supported():
+    """True if the CPU has native bfloat16 support (AVX512-BF16 or AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+class Bf16Generator(torch.nn.Module):
+    """Runs a float32 generator under CPU bfloat16 autocast, returning float32"""
+
+    def __init__(self, model):
+        super(Bf16Generator, self).__init__()
+        self.model = model
+
+    def forward(self, x):
+        with torch.autocast('cpu', dtype=torch.bfloat16):
+            output = self.model(x)
+        return output.float()
+
+
+def preprocess(image_bgr, size=256):
+    """BGR image -> (1, 3, H, W) tensor in [-1, 1], shorter side resized to size
+
+    Uses the serving path's helpers, so calibration and benchmark inputs
+    match what the style-transfer path feeds the generator.
+    """
+    return bgr_to_tensor(resize_short_side(image_bgr, size))
+
+
+def calibration_inputs(image_dir=DEFAULT_CALIBRATION_DIR, limit=CALIBRATION_IMAGES, size=256):
+    """Preprocessed tensors from the first `limit` readable images in image_dir"""
+    inputs = []
+    for path in sorted(Path(image_dir).iterdir()):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        inputs.append(preprocess(image, size))
+        if len(inputs) >= limit:
+            break
+    if not inputs:
+        raise ValueError(f"No calibration images found in {image_dir}")
+    return inputs
+
+
+def quantize_int8(model, inputs):
+    """Static int8 quantization (FX graph mode, x86 backend) calibrated on inputs
+
+    Weights are quantized per channel and activations per tensor; the
+    observers see every calibration image, so activation ranges match real
+    faces rather than synthetic data. Dynamic quantization is not offered:
+    it only covers Linear/LSTM layers and the generators are all convs.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = 'x86'
+    prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping('x86'), (inputs[0],))
+    with torch.no_grad():
+        for x in inputs:
+            prepared(x)
+    return convert_fx(prepared)
+
+
+def int8_path_for(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Where the calibrated int8 TorchScript artifact of a checkpoint lives"""
+    return artifact_path_for(checkpoint_path, '.int8.pt', artifact_dir)
+
+
+def build_int8_generator(checkpoint_path, model_factory, calibration_dir=DEFAULT_CALIBRATION_DIR,
+                         artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Quantize, trace and save the generator; returns the artifact path"""
+    model = model_factory()
+    load_weights(model, checkpoint_path)
+    inputs = calibration_inputs(calibration_dir)
+    quantized = quantize_int8(model.eval(), inputs)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(quantized, inputs[0]))
+
+    path = int8_path_for(checkpoint_path, artifact_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    torch.jit.save(traced, str(tmp_path))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_generator_with_precision(checkpoint_path, model_factory, precision=None, device='cpu',
+                                  artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Load a generator in the requested precision; returns (model, precision used)
+
+    int8 artifacts are calibrated and cached on first use. Modes the host
+    cannot run (anything but fp32 off CPU, bf16 without native support)
+    fall back to fp32.
+    """
+    precision = precision or DEFAULT_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}")
+    if torch.device(device).type != 'cpu' and precision != 'fp32':
+        print(f"{precision} inference is CPU-only, using fp32 on {device}")
+        precision = 'fp32'
+    if precision == 'bf16' and not bf16_supported():
+        print("CPU has no native bfloat16 support, using fp32")
+        precision = 'fp32'
+
+    if precision == 'int8':
+        torch.backends.quantized.engine = 'x86'
+        path = int8_path_for(checkpoint_path, artifact_dir)
+        if not path.exists():
+            print(f"Calibrating int8 generator for {checkpoint_path}")
+            build_int8_generator(checkpoint_path, model_factory, artifact_dir=artifact_dir)
+        # Private copy per process: TorchScript archives cannot be memory-mapped
+        return torch.jit.load(str(path), map_location='cpu'), 'int8'
+
+    model, _ = load_generator(checkpoint_path, model_factory, device, artifact_dir)
+    if precision == 'bf16':
+        return Bf16Generator(model).eval(), 'bf16'
+    return model, 'fp32'
@@ -0,0 +1,58 @@
+import torch
+
+# CycleGAN ResNet generator, state-dict compatible with ModelArchitecture.
+# Moved out of test_real_image.py, which still re-exports it.
+
+class ResnetGenerator(torch.nn.Module):
+    def __init__(self, input_nc=3, output_nc=3, ngf=64, n_blocks=9):
+        super(ResnetGenerator, self).__init__()
+        model = []
+        model += [torch.nn.ReflectionPad2d(3),
+                 torch.nn.Conv2d(input_nc, ngf, kernel_size=7, padding=0),
+                 torch.nn.InstanceNorm2d(ngf),
+                 torch.nn.ReLU(True)]
+
+        n_downsampling = 2
+        for i in range(n_downsampling):
+            mult = 2**i
+            model += [torch.nn.Conv2d(ngf * mult, ngf * mult * 2, kernel_size=3, stride=2, padding=1),
+                     torch.nn.InstanceNorm2d(ngf * mult * 2),
+                     torch.nn.ReLU(True)]
+
+        mult = 2**n_downsampling
+        for i in range(n_blocks):
+            model += [ResnetBlock(ngf * mult)]
+
+        for i in range(n_downsampling):
+            mult = 2**(n_downsampling - i)
+            model += [torch.nn.ConvTranspose2d(ngf * mult, int(ngf * mult / 2), kernel_size=3, stride=2, padding=1, output_padding=1),
+                     torch.nn.InstanceNorm2d(int(ngf * mult / 2)),
+                     torch.nn.ReLU(True)]
+
+        model += [torch.nn.ReflectionPad2d(3),
+                 torch.nn.Conv2d(ngf, output_nc, kernel_size=7, padding=0),
+                 torch.nn.Tanh()]
+
+        self.model = torch.nn.Sequential(*model)
+
+    def forward(self, x):
+        return self.model(x)
+
+class ResnetBlock(torch.nn.Module):
+    def __init__(self, dim):
+        super(ResnetBlock, self).__init__()
+        self.conv_block = self.build_conv_block(dim)
+
+    def build_conv_block(self, dim):
+        conv_block = []
+        conv_block += [torch.nn.ReflectionPad2d(1)]
+        conv_block += [torch.nn.Conv2d(dim, dim, kernel_size=3, padding=0),
+                      torch.nn.InstanceNorm2d(dim),
+                      torch.nn.ReLU(True)]
+        conv_block += [torch.nn.ReflectionPad2d(1)]
+        conv_block += [torch.nn.Conv2d(dim, dim, kernel_size=3, padding=0),
+                      torch.nn.InstanceNorm2d(dim)]
+        return torch.nn.Sequential(*conv_block)
+
+    def forward(self, x):
+        return x + self.conv_block(x)
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Conversions between OpenCV images and generator tensors, without the
+# cvtColor -> PIL -> ToTensor -> Normalize round trip. The channel flip
+# and the [0, 255] -> [-1, 1] scale are fused into one strided pass per
+# channel that writes straight into the destination buffer. numpy does the
+# arithmetic (it beats per-channel torch ops here), so the ONNX backend can
+# use it without torch; torch tensors are zero-copy views via from_numpy.
+
+_SCALE = np.float32(2.0 / 255.0)
+
+
+def bgr_to_nchw(image_bgr, out=None):
+    """uint8 BGR (H, W, 3) image -> float32 RGB (1, 3, H, W) array in [-1, 1]
+
+    Writes into out when given (a float32 (1, 3, H, W) array), so callers
+    can reuse one buffer per image size.
+    """
+    height, width = image_bgr.shape[:2]
+    if out is None:
+        out = np.empty((1, 3, height, width), np.float32)
+    for channel in range(3):
+        np.multiply(image_bgr[:, :, 2 - channel], _SCALE, out=out[0, channel])
+    out -= 1.0
+    return out
+
+
+def bgr_to_tensor(image_bgr, out=None):
+    """uint8 BGR image -> normalized (1, 3, H, W) torch tensor sharing the array's memory"""
+    import torch
+    return torch.from_numpy(bgr_to_nchw(image_bgr, out))
+
+
+def _to_uint8(output, out, channel_order):
+    if not isinstance(output, np.ndarray):
+        output = output.detach().cpu().float().numpy()
+    if output.ndim == 4:
+        output = output[0]
+    height, width = output.shape[1:]
+    if out is None:
+        out = np.empty((height, width, 3), np.uint8)
+    scratch = np.empty((height, width), np.float32)
+    for channel, target in enumerate(channel_order):
+        np.add(output[channel], 1.0, out=scratch)
+        scratch *= 127.5
+        np.clip(scratch, 0.0, 255.0, out=scratch)
+        out[:, :, target] = scratch
+    return out
+
+
+def nchw_to_bgr(output, out=None):
+    """(1, 3, H, W) or (3, H, W) generator output in [-1, 1] -> uint8 BGR image
+
+    Accepts numpy arrays or CPU torch tensors. Values are clamped and
+    truncated like the previous ``(x + 1) / 2 * 255 -> astype(uint8)``
+    path. Writes into out when given (a uint8 (H, W, 3) array).
+    """
+    return _to_uint8(output, out, (2, 1, 0))
+
+
+def nchw_to_rgb(output, out=None):
+    """Like nchw_to_bgr, but keeping the generator's RGB channel order"""
+    return _to_uint8(output, out, (0, 1, 2))
@@ -0,0 +1,179 @@
+import os
+import math
+import threading
+import torch
+
+# GENERATOR_TILING: 'auto' (tile only inputs over the budget), '1' or '0'
+# GENERATOR_TILE_SIZE: largest tile side in pixels (rounded to a multiple of 4)
+# GENERATOR_TILE_OVERLAP: pixels shared by neighbouring tiles and blended
+# GENERATOR_MEMORY_BUDGET_MB: activation memory one forward pass may use
+DEFAULT_TILING = os.environ.get('GENERATOR_TILING', 'auto')
+DEFAULT_TILE_SIZE = int(os.environ.get('GENERATOR_TILE_SIZE', '1024'))
+DEFAULT_OVERLAP = int(os.environ.get('GENERATOR_TILE_OVERLAP', '64'))
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get('GENERATOR_MEMORY_BUDGET_MB', '1024'))
+
+# Peak activation memory of the ResNet generators per input pixel under
+# inference_mode (measured 0.9-1.2 KB at 256-1024 px on CPU)
+ACTIVATION_BYTES_PER_PIXEL = 1024
+
+# The generators downsample twice by 2
+SIZE_MULTIPLE = 4
+
+
+def tile_size_for_budget(memory_budget_mb, max_tile_size=DEFAULT_TILE_SIZE):
+    """Largest square tile side (multiple of 4) whose activations fit the budget"""
+    side = int(math.sqrt(memory_budget_mb * 2 ** 20 / ACTIVATION_BYTES_PER_PIXEL))
+    side = min(side, max_tile_size)
+    return max(SIZE_MULTIPLE * 16, side // SIZE_MULTIPLE * SIZE_MULTIPLE)
+
+
+def tile_starts(length, tile, overlap):
+    """Start offsets of equal tiles covering [0, length), neighbours sharing >= overlap"""
+    if length <= tile:
+        return [0]
+    stride = tile - overlap
+    starts = list(range(0, length - tile, stride))
+    # The last tile is flush with the far edge, so every tile has one shape
+    starts.append(length - tile)
+    return starts
+
+
+def blend_ramp(length, overlap, fade_start, fade_end):
+    """1-D weights easing in over `overlap` px at the faded ends"""
+    index = torch.arange(length, dtype=torch.float32)
+    distance = torch.full((length,), float('inf'))
+    if fade_start:
+        distance = torch.minimum(distance, index + 1)
+    if fade_end:
+        distance = torch.minimum(distance, length - index)
+    t = torch.clamp(distance / max(overlap, 1), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _pad_to_multiple(x):
+    height, width = x.shape[-2:]
+    pad_h = -height % SIZE_MULTIPLE
+    pad_w = -width % SIZE_MULTIPLE
+    if pad_h or pad_w:
+        mode = 'reflect' if pad_h < height and pad_w < width else 'replicate'
+        x = torch.nn.functional.pad(x, (0, pad_w, 0, pad_h), mode=mode)
+    return x
+
+
+class TiledGenerator:
+    """Runs a generator over overlapping tiles so any input size fits a memory budget
+
+    Tiles share ``overlap`` pixels with their neighbours and are blended
+    with smoothstep weights, which hides the seams. The generators'
+    InstanceNorm layers normalise each tile with its own statistics, so
+    large tiles (and a generous overlap) give the closest match to a
+    whole-image pass. Tile forwards are serialised so at most one tile's
+    activations are alive per TiledGenerator; the full-size input, output
+    and blend weights (about 32 bytes per pixel) come on top of the budget.
+    """
+
+    def __init__(self, model, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, tiling=DEFAULT_TILING, memory_format=None,
+                 device=None):
+        self.model = model
+        self.memory_budget_mb = memory_budget_mb
+        self.tile_size = tile_size_for_budget(memory_budget_mb, tile_size)
+        self.overlap = min(overlap, self.tile_size // 4)
+        self.tiling = str(tiling)
+        self.memory_format = memory_format
+        # Tiles are moved here for the forward pass; blending stays on CPU
+        self.device = device
+        self.lock = threading.Lock()
+
+    def needs_tiling(self, height, width):
+        if self.tiling == '0':
+            return False
+        if self.tiling == '1':
+            return max(height, width) > self.tile_size
+        return height * width * ACTIVATION_BYTES_PER_PIXEL > self.memory_budget_mb * 2 ** 20
+
+    def _forward(self, x):
+        if self.device is not None:
+            x = x.to(self.device)
+        if self.memory_format is not None:
+            x = x.contiguous(memory_format=self.memory_format)
+        return self.model(x).float().cpu()
+
+    def __call__(self, x):
+        """(1, 3, H, W) CPU tensor in [-1, 1] -> (1, 3, H, W) CPU generator output"""
+        height, width = x.shape[-2:]
+        with torch.inference_mode(), self.lock:
+            if not self.needs_tiling(height, width):
+                return self._forward(_pad_to_multiple(x))[..., :height, :width]
+            return self._tiled(x)
+
+    def _tiled(self, x):
+        height, width = x.shape[-2:]
+        tile_h = min(self.tile_size, height + -height % SIZE_MULTIPLE)
+        tile_w = min(self.tile_size, width + -width % SIZE_MULTIPLE)
+        padded = _pad_to_multiple(x)
+        padded_h, padded_w = padded.shape[-2:]
+
+        output = torch.zeros((1, 3, padded_h, padded_w))
+        weights = torch.zeros((padded_h, padded_w))
+        rows = tile_starts(padded_h, tile_h, self.overlap)
+        cols = tile_starts(padded_w, tile_w, self.overlap)
+        for top in rows:
+            row_ramp = blend_ramp(tile_h, self.overlap, top > 0, top + tile_h < padded_h)
+            for left in cols:
+                col_ramp = blend_ramp(tile_w, self.overlap, left > 0, left + tile_w < padded_w)
+                window = torch.outer(row_ramp, col_ramp)
+                tile = self._forward(padded[..., top:top + tile_h, left:left + tile_w])
+                output[..., top:top + tile_h, left:left + tile_w].addcmul_(tile, window)
+                weights[top:top + tile_h, left:left + tile_w].add_(window)
+                del tile
+        output.div_(weights.clamp_(min=1e-6))
+        return output[..., :height, :width]
+
+
+def _read_status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+class PeakRSS:
+    """Measures the process's peak RSS in MB over a with-block
+
+    Resets the kernel's high-water mark on entry (Linux, /proc/self/clear_refs)
+    so the peak belongs to this block. The mark is process-wide: a reading
+    is only valid when nothing else runs in the process meanwhile, and
+    entering a block clobbers any other block's measurement. Callers that
+    may run concurrently pass ``enabled=False`` unless they know they are
+    alone (ModelLoader counts requests in flight). ``peak_mb`` stays None
+    when disabled or where /proc is not available.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.start_mb = None
+        self.peak_mb = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            self.start_mb = _read_status('VmRSS')
+        except OSError:
+            self.start_mb = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start_mb is not None:
+            self.peak_mb = _read_status('VmHWM')
+        return False
+
+    @property
+    def delta_mb(self):
+        if self.peak_mb is None:
+            return None
+        return self.peak_mb - self.start_mb
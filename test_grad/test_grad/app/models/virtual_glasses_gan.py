@@ -1,10 +1,13 @@
+import os
+import threading
 import torch
 import torch.nn as nn
-import torchvision.transforms as transforms
-import cv2
 import numpy as np
-from PIL import Image
 from pathlib import Path
+from typing import Dict, Tuple
+from .weight_store import load_weights
+from .tensor_io import bgr_to_tensor, nchw_to_bgr
+from ..utils.resource_registry import get_registry
 
 class ResidualBlock(nn.Module):
     """Residual Block used in Generator"""
@@ -95,69 +98,123 @@ class Discriminator(nn.Module):
     def forward(self, x):
         return self.model(x)
 
+def network_name(role, checkpoint_path, device):
+    return f"virtual_glasses_gan:{role}:{device}:{os.path.abspath(checkpoint_path)}"
+
+def acquire_network(role, network_class, checkpoint_path, device):
+    """Shared, evaluation-mode network for a checkpoint from the resource registry"""
+    return get_registry().acquire(
+        network_name(role, checkpoint_path, device),
+        lambda: load_weights(network_class().to(device), checkpoint_path, device).eval()
+    )
+
+def release_network(role, checkpoint_path, device):
+    get_registry().release(network_name(role, checkpoint_path, device))
+
+# Network roles: G_A adds glasses, G_B removes them, D_A/D_B are only
+# needed for training
+NETWORKS = {
+    'G_A': Generator,
+    'G_B': Generator,
+    'D_A': Discriminator,
+    'D_B': Discriminator
+}
+# What serving needs: adding glasses only
+INFERENCE_NETWORKS = ('G_A',)
+
 class VirtualGlassesGAN:
-    def __init__(self, device='cuda' if torch.cuda.is_available() else 'cpu'):
+    def __init__(self, device='cuda' if torch.cuda.is_available() else 'cpu',
+                 networks: Tuple[str, ...] = ()):
         self.device = device
-        self.transform = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-        ])
         
-        # Initialize models
-        self.netG_A = Generator().to(device)  # Original to Glasses
-        self.netG_B = Generator().to(device)  # Glasses to Original
-        self.netD_A = Discriminator().to(device)  # Discriminator for domain A
-        self.netD_B = Discriminator().to(device)  # Discriminator for domain B
+        # Networks are loaded on first use; the ones declared here are
+        # loaded up front by load_models (e.g. INFERENCE_NETWORKS)
+        unknown = set(networks) - set(NETWORKS)
+        if unknown:
+            raise ValueError(f"Unknown networks {sorted(unknown)}, expected some of {list(NETWORKS)}")
+        self.required_networks = tuple(networks)
+        self.model_paths = {}
+        self._networks = {}
+        self._lock = threading.Lock()
         
     def load_models(self, model_paths: Dict[str, str]):
-        """Load trained model weights"""
+        """Record the checkpoint paths and load the declared networks
+
+        Paths are only needed for networks that are used; the rest load
+        on first access (see network()).
+        """
         try:
-            self.netG_A.load_state_dict(torch.load(model_paths['G_A'], map_location=self.device))
-            self.netG_B.load_state_dict(torch.load(model_paths['G_B'], map_location=self.device))
-            self.netD_A.load_state_dict(torch.load(model_paths['D_A'], map_location=self.device))
-            self.netD_B.load_state_dict(torch.load(model_paths['D_B'], map_location=self.device))
-            
-            # Set models to evaluation mode
-            self.netG_A.eval()
-            self.netG_B.eval()
-            self.netD_A.eval()
-            self.netD_B.eval()
-            
+            self.model_paths.update(model_paths)
+            for role in self.required_networks:
+                self.network(role)
             return True
         except Exception as e:
             print(f"Error loading models: {str(e)}")
             return False
             
+    def network(self, role: str) -> nn.Module:
+        """The network for a role, loading it on first use
+
+        Weights are memory-mapped through the shared weight store and loaded
+        once per process however many instances ask for them.
+        """
+        net = self._networks.get(role)
+        if net is not None:
+            return net
+        if role not in NETWORKS:
+            raise ValueError(f"Unknown network {role}")
+        if role not in self.model_paths:
+            raise RuntimeError(f"No checkpoint for {role}; pass it to load_models")
+        with self._lock:
+            if role not in self._networks:
+                self._networks[role] = acquire_network(
+                    role, NETWORKS[role], self.model_paths[role], self.device
+                )
+            return self._networks[role]
+        
+    netG_A = property(lambda self: self.network('G_A'))  # Original to Glasses
+    netG_B = property(lambda self: self.network('G_B'))  # Glasses to Original
+    netD_A = property(lambda self: self.network('D_A'))  # Discriminator for domain A
+    netD_B = property(lambda self: self.network('D_B'))  # Discriminator for domain B
+        
+    def loaded_networks(self):
+        return sorted(self._networks)
+        
+    def unload(self, role: str):
+        """Release a network; it is loaded again on next use"""
+        with self._lock:
+            if self._networks.pop(role, None) is not None:
+                release_network(role, self.model_paths[role], self.device)
+            
     def preprocess_image(self, image: np.ndarray) -> torch.Tensor:
         """Preprocess image for model input"""
-        # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        # Apply transformations
-        tensor = self.transform(image_rgb)
-        # Add batch dimension
-        tensor = tensor.unsqueeze(0).to(self.device)
-        return tensor
+        # BGR uint8 -> normalized RGB NCHW in one pass
+        return bgr_to_tensor(image).to(self.device)
         
     def postprocess_image(self, tensor: torch.Tensor) -> np.ndarray:
         """Convert model output tensor to image"""
-        # Move to CPU and convert to numpy
-        image = tensor.cpu().squeeze().permute(1, 2, 0).detach().numpy()
-        # Denormalize
-        image = ((image + 1) * 127.5).clip(0, 255).astype(np.uint8)
-        # Convert RGB to BGR
-        image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        return image_bgr
+        # Denormalize, clamp and flip back to BGR uint8 in one pass
+        return nchw_to_bgr(tensor)
         
     @torch.no_grad()
-    def process_image(self, image: np.ndarray) -> np.ndarray:
-        """Process an image through the GAN"""
+    def process_image(self, image: np.ndarray, remove_glasses: bool = False) -> np.ndarray:
+        """Process an image through the GAN
+
+        Adds glasses with G_A; with remove_glasses, removes them with G_B
+        instead (G_B is only loaded the first time this is asked for).
+        """
         # Preprocess
         input_tensor = self.preprocess_image(image)
         
-        # Generate output using G_A (add virtual glasses)
-        output_tensor = self.netG_A(input_tensor)
+        # Generate output using G_A (add virtual glasses) or G_B (remove them)
+        generator = self.netG_B if remove_glasses else self.netG_A
+        output_tensor = generator(input_tensor)
         
         # Postprocess
         result_image = self.postprocess_image(output_tensor)
         
         return result_image
+        
+    def remove_glasses(self, image: np.ndarray) -> np.ndarray:
+        """Remove glasses from an image with G_B"""
+        return self.process_image(image, remove_glasses=True)
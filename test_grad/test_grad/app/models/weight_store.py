@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import zipfile
+import threading
+import torch
+from .artifacts import DEFAULT_ARTIFACT_DIR, artifact_path_for
+
+# Checkpoints are opened with torch.load(mmap=True) and assigned straight
+# into the modules, so parameters are views of the page cache: loading only
+# maps the file, and every process reading the same file shares one copy of
+# the weights. WEIGHT_MMAP=0 falls back to reading private copies.
+#
+# Sharing only covers eager modules in their checkpoint layout: the frozen
+# (FROZEN_GENERATOR) and int8 TorchScript artifacts are read with
+# torch.jit.load, which cannot map, and channels_last conversion or a
+# non-CPU device copies the weights too. Those paths are only shared when
+# loaded in the pre-fork master (app/prefork.py), copy-on-write.
+USE_MMAP = os.environ.get('WEIGHT_MMAP', '1') == '1'
+
+
+def mmap_path_for(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Where the mmap-able copy of a legacy-format checkpoint lives"""
+    return artifact_path_for(checkpoint_path, '.weights.pt', artifact_dir)
+
+
+def convert_legacy_checkpoint(checkpoint_path, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Re-save a pre-1.6 (non-zip) checkpoint in the zip format; returns the new path
+
+    Only the zip format can be memory-mapped. The copy is keyed by the
+    checkpoint's hash, so it is rebuilt when the checkpoint changes.
+    """
+    path = mmap_path_for(checkpoint_path, artifact_dir)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        torch.save(torch.load(checkpoint_path, map_location='cpu'), str(tmp_path))
+        os.replace(tmp_path, path)
+    return path
+
+
+def memory_usage():
+    """This process's memory in MB from /proc/self/smaps_rollup
+
+    uss (private pages) is what the process alone costs; rss counts shared
+    pages in full and pss splits them between the processes sharing them.
+    Returns None where smaps_rollup is not available.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return None
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        'rss_mb': mb(fields.get('Rss', 0)),
+        'pss_mb': mb(fields.get('Pss', 0)),
+        'uss_mb': mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)),
+        'shared_mb': mb(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0))
+    }
+
+
+class WeightStore:
+    """Loads checkpoints memory-mapped and keeps one state dict per file
+
+    Modules loaded through load_into() on CPU take the mapped tensors as
+    their parameters (load_state_dict(assign=True)), so the weights are
+    never copied. Anything that rewrites parameters afterwards (.to() with
+    a new dtype or memory format, training) makes a private copy again.
+    """
+
+    def __init__(self, use_mmap=USE_MMAP, artifact_dir=DEFAULT_ARTIFACT_DIR):
+        self.use_mmap = use_mmap
+        self.artifact_dir = artifact_dir
+        self.state_dicts = {}
+        self.loads = {}
+        # Addresses of mapped storages, to tell which parameters share pages
+        self.mapped_storages = set()
+        self.lock = threading.Lock()
+
+    def _load(self, checkpoint_path):
+        if not self.use_mmap:
+            return torch.load(checkpoint_path, map_location='cpu', weights_only=True), False
+        path = checkpoint_path
+        if not zipfile.is_zipfile(path):
+            print(f"Converting legacy checkpoint {checkpoint_path} for memory mapping")
+            path = convert_legacy_checkpoint(checkpoint_path, self.artifact_dir)
+        return torch.load(str(path), map_location='cpu', mmap=True, weights_only=True), True
+
+    def state_dict(self, checkpoint_path):
+        """The (mapped, read-only by convention) state dict of a checkpoint"""
+        key = os.path.abspath(checkpoint_path)
+        with self.lock:
+            if key not in self.state_dicts:
+                started = time.perf_counter()
+                state_dict, mapped = self._load(checkpoint_path)
+                self.state_dicts[key] = state_dict
+                if mapped:
+                    self.mapped_storages.update(t.untyped_storage().data_ptr()
+                                                for t in state_dict.values() if torch.is_tensor(t))
+                self.loads[key] = {
+                    'load_ms': round((time.perf_counter() - started) * 1000, 2),
+                    'mmap': mapped,
+                    'mb': round(sum(t.numel() * t.element_size() for t in state_dict.values()
+                                    if torch.is_tensor(t)) / 2 ** 20, 1)
+                }
+            return self.state_dicts[key]
+
+    def load_into(self, model, checkpoint_path, device='cpu'):
+        """Load a checkpoint into model; on CPU the parameters share the mapped pages"""
+        state_dict = self.state_dict(checkpoint_path)
+        if torch.device(device).type == 'cpu':
+            model.load_state_dict(state_dict, assign=True)
+        else:
+            model.to(device).load_state_dict(state_dict)
+        return model
+
+    def shares_weights(self, model):
+        """Whether any of model's parameters are still views of a mapped checkpoint"""
+        with self.lock:
+            return any(p.untyped_storage().data_ptr() in self.mapped_storages
+                       for p in model.parameters())
+
+    def release(self, checkpoint_path):
+        """Drop the store's reference; modules loaded from it keep their tensors"""
+        with self.lock:
+            self.state_dicts.pop(os.path.abspath(checkpoint_path), None)
+
+    def stats(self):
+        with self.lock:
+            loads = dict(self.loads)
+        return {
+            'pid': os.getpid(),
+            'mmap': self.use_mmap,
+            'checkpoints': loads,
+            'memory': memory_usage()
+        }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_weight_store():
+    """Process-wide weight store shared by every model loader"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = WeightStore()
+    return _default_store
+
+
+def shares_weights(model):
+    return get_weight_store().shares_weights(model)
+
+
+def load_weights(model, checkpoint_path, device='cpu'):
+    """Load checkpoint_path into model through the shared weight store"""
+    return get_weight_store().load_into(model, checkpoint_path, device)
+
+
+if __name__ == "__main__":
+    # Report load time and memory for the given checkpoints
+    from .model_loader import ModelArchitecture
+    checkpoints = sys.argv[1:] or [str(DEFAULT_ARTIFACT_DIR.parent / '83_net_G_A.pth')]
+    baseline = memory_usage()
+    for checkpoint in checkpoints:
+        load_weights(ModelArchitecture(), checkpoint)
+    stats = get_weight_store().stats()
+    print(f"before: {baseline}")
+    for checkpoint, load in stats['checkpoints'].items():
+        print(f"{checkpoint}: {load}")
+    print(f"after: {stats['memory']}")
@@ -0,0 +1,192 @@
+"""Pre-fork server: load the models once, then fork uvicorn workers
+
+    python -m app.prefork [--workers N] [--host 0.0.0.0] [--port 8000]
+
+The master imports the app, loads the G_A weights and compiles and maps
+the glasses assets before forking, so every worker inherits them
+copy-on-write instead of loading its own copy. Dead workers are replaced;
+SIGHUP reloads the weights in the master and replaces the workers one at
+a time, each old worker finishing its in-flight requests before it exits.
+SIGTERM/SIGINT drain every worker and stop.
+"""
+import os
+import sys
+import gc
+import time
+import signal
+import socket
+import argparse
+
+DEFAULT_WORKERS = int(os.environ.get('PREFORK_WORKERS', os.environ.get('WEB_CONCURRENCY', '2')))
+# Seconds a worker gets to finish in-flight requests before it is killed
+GRACEFUL_TIMEOUT = float(os.environ.get('PREFORK_GRACEFUL_TIMEOUT', '30'))
+
+
+def preload(main):
+    """Load everything workers should share, leaving no threads running"""
+    from .utils.glasses_assets import DEFAULT_COMPILED_DIR, SOURCE_EXTENSIONS, compile_directory
+
+    started = time.perf_counter()
+    if main.model_loader.backend == 'onnx':
+        # onnxruntime sessions own thread pools that do not survive fork
+        print("ONNX backend: workers load G_A after forking")
+    else:
+        main.model_loader.load_weights()
+
+    glasses_dir = DEFAULT_COMPILED_DIR.parent
+    for bundle in compile_directory(glasses_dir):
+        print(f"Compiled {bundle}")
+    for path in sorted(glasses_dir.iterdir()):
+        if path.suffix.lower() in SOURCE_EXTENSIONS:
+            main.glasses_overlay.get_glasses_asset(str(path))
+
+    # Keep the inherited objects out of the collector so workers do not
+    # touch (and copy) their pages during garbage collection
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded in {time.perf_counter() - started:.2f}s")
+
+
+class Master:
+    def __init__(self, app_module, host, port, workers, graceful_timeout=GRACEFUL_TIMEOUT):
+        self.main = app_module
+        self.workers = max(1, workers)
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.running = True
+        self.reload_requested = False
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        self.address = f"http://{host}:{port}"
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+
+        # Worker: uvicorn installs its own SIGTERM/SIGINT handlers, which
+        # stop accepting and wait for in-flight requests
+        for sig in (signal.SIGHUP, signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        status = 0
+        try:
+            import uvicorn
+            from .models.inference_config import get_inference_config
+            get_inference_config().apply()
+            server = uvicorn.Server(uvicorn.Config(self.main.app, log_level='info'))
+            server.run(sockets=[self.sock])
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            status = 1
+        finally:
+            os._exit(status)
+
+    def reap(self):
+        """Collect exited workers; returns their pids"""
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.children.pop(pid, None) is not None:
+                exited.append(pid)
+                if self.running:
+                    print(f"Worker {pid} exited with status {status}")
+        return exited
+
+    def stop_worker(self, pid, timeout=None):
+        """Ask a worker to drain and exit, killing it after the graceful timeout"""
+        timeout = self.graceful_timeout if timeout is None else timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.children.pop(pid, None)
+                return
+            time.sleep(0.05)
+        print(f"Worker {pid} did not drain in {timeout}s, killing it")
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        self.children.pop(pid, None)
+
+    def reload(self):
+        """Reload the weights in the master, then replace workers one by one"""
+        print("Reloading models")
+        old = list(self.children)
+        from .utils.asset_cache import get_asset_cache
+        self.main.model_loader.unload()
+        get_asset_cache().invalidate()
+        gc.unfreeze()
+        preload(self.main)
+        for pid in old:
+            # Bring the replacement up before draining the old worker, so
+            # capacity never drops by more than one
+            self.spawn()
+            self.stop_worker(pid)
+
+    def run(self):
+        print(f"Master {os.getpid()} serving {self.address} with {self.workers} workers")
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        while self.running:
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            while self.running and len(self.children) < self.workers:
+                self.spawn()
+            time.sleep(0.2)
+
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            print(f"Worker {pid} did not drain in {self.graceful_timeout}s, killing it")
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+        self.sock.close()
+
+    def handle_stop(self, signum, frame):
+        self.running = False
+
+    def handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+
+def serve(host='0.0.0.0', port=8000, workers=DEFAULT_WORKERS):
+    # Size each worker's inference thread budget before the config exists
+    os.environ.setdefault('INFERENCE_WORKERS', str(workers))
+    from . import main
+    preload(main)
+    Master(main, host, port, workers).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+    sys.exit(0)
@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+import cv2
+from .glasses_assets import load_glasses_asset
+
+DEFAULT_ASSET_CACHE_BYTES = int(float(os.environ.get('GLASSES_ASSET_CACHE_MB', '128')) * 2**20)
+
+
+def file_version(path):
+    """Identify a file's current contents by path, mtime and size"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class AssetCache:
+    """LRU cache of decoded glasses images and compiled bundles, bounded by total bytes
+
+    Every lookup stats the file and reloads it when its mtime or size has
+    changed, so replaced assets are picked up without a restart. Images are
+    decoded with their alpha channel and returned read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_ASSET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.images = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def version(self, path):
+        """Version token of the file at path; raises OSError if it is missing"""
+        return file_version(path)
+
+    def _lookup(self, key, version):
+        with self.lock:
+            entry = self.images.get(key)
+            if entry is not None:
+                cached_version, image = entry
+                if cached_version == version:
+                    self.images.move_to_end(key)
+                    self.hits += 1
+                    return image
+                # The file was replaced since it was decoded
+                del self.images[key]
+                self.bytes -= image.nbytes
+                self.reloads += 1
+            self.misses += 1
+        return None
+
+    def get(self, path):
+        """Return the decoded image at path, or None if it cannot be read"""
+        try:
+            version = file_version(path)
+        except OSError:
+            return None
+        key = version[0]
+        image = self._lookup(key, version)
+        if image is not None:
+            return image
+
+        image = cv2.imread(key, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return None
+        image.setflags(write=False)
+        self._put(key, version, image)
+        return image
+
+    def get_compiled(self, bundle):
+        """Return the loaded compiled glasses bundle, or None if it is missing
+
+        Bundles share the LRU and byte budget with decoded images and are
+        reloaded when their meta.json is rewritten.
+        """
+        try:
+            version = file_version(os.path.join(bundle, 'meta.json'))
+        except OSError:
+            return None
+        key = os.path.abspath(bundle)
+        asset = self._lookup(key, version)
+        if asset is None:
+            asset = load_glasses_asset(bundle)
+            self._put(key, version, asset)
+        return asset
+
+    def _put(self, key, version, image):
+        if image.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.images.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1].nbytes
+            self.images[key] = (version, image)
+            self.bytes += image.nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.images.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, path=None):
+        """Drop one cached file, or everything when path is None"""
+        with self.lock:
+            if path is None:
+                self.images.clear()
+                self.bytes = 0
+                return
+            entry = self.images.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self.bytes -= entry[1].nbytes
+
+    def stats(self):
+        """Entry count, decoded bytes and hit rate"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.images),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_asset_cache():
+    """Process-wide glasses image cache"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AssetCache()
+    return _default_cache
@@ -0,0 +1,87 @@
+import cv2
+
+
+def clip_region(dst_shape, overlay_shape, x, y):
+    """Intersect an overlay placed at (x, y) with the destination image
+
+    Returns (dst_slices, overlay_slices) for the overlapping part, or None if
+    the overlay lies completely outside. Offsets may be negative.
+    """
+    dst_h, dst_w = dst_shape[:2]
+    ovl_h, ovl_w = overlay_shape[:2]
+    x, y = int(x), int(y)
+
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + ovl_w, dst_w), min(y + ovl_h, dst_h)
+    if x1 >= x2 or y1 >= y2:
+        return None
+
+    dst_slices = (slice(y1, y2), slice(x1, x2))
+    overlay_slices = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+    return dst_slices, overlay_slices
+
+
+def blend_roi(dst_roi, color, alpha):
+    """Blend color over dst_roi in place with an 8-bit alpha plane
+
+    Computes round((color * a + dst * (255 - a)) / 255) with uint16
+    fixed-point products (255 * 255 fits exactly), so no float64
+    temporaries are created and results match exact rounding.
+    """
+    a = cv2.merge((alpha, alpha, alpha))
+    mixed = cv2.multiply(color, a, dtype=cv2.CV_16U)
+    cv2.add(mixed, cv2.multiply(dst_roi, cv2.bitwise_not(a), dtype=cv2.CV_16U), dst=mixed)
+    dst_roi[...] = cv2.convertScaleAbs(mixed, alpha=1.0 / 255.0)
+    return dst_roi
+
+
+def alpha_blend(dst, overlay, x=0, y=0, alpha=None):
+    """Composite overlay onto dst in place with its top-left corner at (x, y)
+
+    overlay is a uint8 BGR or BGRA image. The alpha plane comes from the
+    ``alpha`` argument if given, else from the overlay's fourth channel;
+    without either the overlay is copied opaquely. Parts falling outside
+    dst are clipped. Returns dst.
+    """
+    region = clip_region(dst.shape, overlay.shape, x, y)
+    if region is None:
+        return dst
+    dst_slices, overlay_slices = region
+
+    dst_roi = dst[dst_slices]
+    color = overlay[overlay_slices][..., :3]
+    if alpha is None and overlay.ndim == 3 and overlay.shape[2] == 4:
+        alpha = overlay[overlay_slices][..., 3]
+    elif alpha is not None:
+        alpha = alpha[overlay_slices]
+
+    if alpha is None:
+        dst_roi[...] = color
+    else:
+        blend_roi(dst_roi, color, alpha)
+    return dst
+
+
+def blend_roi_premultiplied(dst_roi, premultiplied, alpha):
+    """Blend premultiplied color over dst_roi in place
+
+    premultiplied holds round(color * a / 255), so only the destination
+    needs scaling: out = premultiplied + round(dst * (255 - a) / 255).
+    """
+    inverse = cv2.bitwise_not(cv2.merge((alpha, alpha, alpha)))
+    scaled = cv2.multiply(dst_roi, inverse, scale=1.0 / 255.0)
+    dst_roi[...] = cv2.add(scaled, premultiplied)
+    return dst_roi
+
+
+def alpha_blend_premultiplied(dst, premultiplied, alpha, x=0, y=0):
+    """Composite a premultiplied BGR sprite and its alpha plane onto dst in place
+
+    Same placement and clipping rules as alpha_blend. Returns dst.
+    """
+    region = clip_region(dst.shape, premultiplied.shape, x, y)
+    if region is None:
+        return dst
+    dst_slices, overlay_slices = region
+    blend_roi_premultiplied(dst[dst_slices], premultiplied[overlay_slices], alpha[overlay_slices])
+    return dst
@@ -1,20 +1,16 @@
 import cv2
 import numpy as np
 import os
+from .resource_registry import haar_cascade
 
 class FaceDetector:
     def __init__(self):
-        # Load pre-trained face and eye detection models from OpenCV
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        self.eye_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_eye.xml'
-        )
+        # Pre-trained face and eye detection models from OpenCV, shared
+        # process-wide through the resource registry
+        self.face_cascade = haar_cascade('haarcascade_frontalface_default.xml')
+        self.eye_cascade = haar_cascade('haarcascade_eye.xml')
         # Additional cascade for better eye detection
-        self.eye_tree_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_eye_tree_eyeglasses.xml'
-        )
+        self.eye_tree_cascade = haar_cascade('haarcascade_eye_tree_eyeglasses.xml')
 
     def detect(self, image):
         """
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import uuid
+import hashlib
+import cv2
+import numpy as np
+from pathlib import Path
+
+# Compiled bundles live next to the source images by default
+DEFAULT_COMPILED_DIR = Path(__file__).parent.parent.parent / "glasses_images" / "compiled"
+
+BUNDLE_SUFFIX = ".glasses"
+SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+FORMAT_VERSION = 4
+
+
+class GlassesAsset:
+    """A compiled glasses sprite: trimmed to its alpha bounding box, premultiplied
+
+    color holds round(bgr * alpha / 255) and alpha the matching 8-bit plane,
+    both cropped to ``bbox`` (x, y, w, h) inside the original image of
+    ``source_size`` (height, width). ``anchors`` maps 'left_lens',
+    'right_lens' and 'bridge' to (x, y) in original image pixels.
+    """
+
+    def __init__(self, color, alpha, meta):
+        self.color = color
+        self.alpha = alpha
+        self.meta = meta
+        self.source_size = tuple(meta["source_size"])
+        self.bbox = tuple(meta["bbox"])
+        self.anchors = {name: tuple(point) for name, point in meta["anchors"].items()}
+
+    @property
+    def nbytes(self):
+        return self.color.nbytes + self.alpha.nbytes
+
+
+def bundle_path_for(source_path, compiled_dir=DEFAULT_COMPILED_DIR):
+    """Where the compiled bundle of a source image lives
+
+    Named after the full file name plus a hash of the resolved path, so
+    foo.png and foo.jpg, or two foo.png in different directories, get
+    separate bundles.
+    """
+    resolved = str(Path(source_path).resolve())
+    digest = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:10]
+    return Path(compiled_dir) / f"{Path(source_path).name}-{digest}{BUNDLE_SUFFIX}"
+
+
+def _source_signature(source_path):
+    stat = os.stat(source_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _lens_anchors(alpha, bbox):
+    """Alpha-weighted centroids of the left and right halves, plus the bridge"""
+    x, y, w, h = bbox
+    weights = alpha[y:y+h, x:x+w].astype(np.float64)
+    ys, xs = np.mgrid[0:h, 0:w]
+    half = w // 2
+
+    def centroid(region):
+        total = weights[:, region].sum()
+        if total == 0:
+            return (x + (region.start + region.stop) / 2.0, y + h / 2.0)
+        return (
+            x + float((xs[:, region] * weights[:, region]).sum() / total),
+            y + float((ys[:, region] * weights[:, region]).sum() / total)
+        )
+
+    left = centroid(slice(0, max(half, 1)))
+    right = centroid(slice(half, w))
+    bridge = ((left[0] + right[0]) / 2.0, (left[1] + right[1]) / 2.0)
+    return {"left_lens": left, "right_lens": right, "bridge": bridge}
+
+
+def compile_glasses(source_path, compiled_dir=DEFAULT_COMPILED_DIR):
+    """Compile one glasses image into a bundle directory and return its path
+
+    The bundle holds the color (premultiplied BGR) and alpha planes as
+    .npy files named in meta.json. Arrays are stored uncompressed so they
+    can be memory-mapped.
+    """
+    image = cv2.imread(str(source_path), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Could not read glasses image from {source_path}")
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+    elif image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+
+    alpha = image[:, :, 3]
+    points = cv2.findNonZero(alpha)
+    if points is None:
+        bbox = (0, 0, 0, 0)
+    else:
+        bbox = tuple(int(v) for v in cv2.boundingRect(points))
+    x, y, w, h = bbox
+
+    trimmed_alpha = np.ascontiguousarray(alpha[y:y+h, x:x+w])
+    trimmed_color = image[y:y+h, x:x+w, :3]
+    alpha3 = cv2.merge((trimmed_alpha, trimmed_alpha, trimmed_alpha))
+    premultiplied = cv2.multiply(trimmed_color, alpha3, scale=1.0 / 255.0)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "source": str(Path(source_path).resolve()),
+        "source_signature": _source_signature(source_path),
+        "source_size": [int(image.shape[0]), int(image.shape[1])],
+        "bbox": list(bbox),
+        "anchors": _lens_anchors(alpha, bbox) if w and h else {}
+    }
+
+    bundle = bundle_path_for(source_path, compiled_dir)
+    bundle.mkdir(parents=True, exist_ok=True)
+    # Running workers may have the previous planes memory-mapped, so files
+    # are never rewritten in place: each compile writes new, uniquely named
+    # planes and then swaps meta.json (which names them) in atomically.
+    token = uuid.uuid4().hex[:12]
+    meta["color"] = f"color-{token}.npy"
+    meta["alpha"] = f"alpha-{token}.npy"
+    _write_atomic(bundle / meta["color"], lambda f: np.save(f, premultiplied))
+    _write_atomic(bundle / meta["alpha"], lambda f: np.save(f, trimmed_alpha))
+    _write_atomic(bundle / "meta.json", lambda f: f.write(json.dumps(meta, indent=2).encode()))
+    _remove_unreferenced(bundle, {meta["color"], meta["alpha"]})
+    return bundle
+
+
+def _write_atomic(path, write):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _remove_unreferenced(bundle, keep):
+    """Delete superseded planes; processes that mapped them keep their pages"""
+    for path in bundle.glob("*.npy"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def load_glasses_asset(bundle, mmap=True):
+    """Load a compiled bundle; with mmap the pixel planes are shared between processes"""
+    bundle = Path(bundle)
+    mode = "r" if mmap else None
+    for attempt in range(2):
+        with open(bundle / "meta.json") as f:
+            meta = json.load(f)
+        try:
+            color = np.load(bundle / meta["color"], mmap_mode=mode)
+            alpha = np.load(bundle / meta["alpha"], mmap_mode=mode)
+        except FileNotFoundError:
+            # Recompiled between reading meta.json and opening the planes
+            if attempt:
+                raise
+            continue
+        return GlassesAsset(color, alpha, meta)
+
+
+def find_compiled(source_path, compiled_dir=DEFAULT_COMPILED_DIR):
+    """Return the bundle for source_path if it exists and is up to date, else None"""
+    bundle = bundle_path_for(source_path, compiled_dir)
+    try:
+        with open(bundle / "meta.json") as f:
+            meta = json.load(f)
+        signature = _source_signature(source_path)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != FORMAT_VERSION or meta.get("source_signature") != signature:
+        return None
+    if meta.get("source") != str(Path(source_path).resolve()):
+        # Compiled from a different image that happens to map to this bundle
+        return None
+    return bundle
+
+
+def compile_directory(source_dir, compiled_dir=DEFAULT_COMPILED_DIR, force=False):
+    """Compile every glasses image in source_dir that is missing or stale"""
+    compiled = []
+    for path in sorted(Path(source_dir).iterdir()):
+        if path.suffix.lower() not in SOURCE_EXTENSIONS:
+            continue
+        if not force and find_compiled(path, compiled_dir) is not None:
+            continue
+        compiled.append(compile_glasses(path, compiled_dir))
+    return compiled
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m app.utils.glasses_assets <glasses_dir_or_image> [compiled_dir]")
+        sys.exit(1)
+
+    target = Path(sys.argv[1])
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COMPILED_DIR
+    if target.is_dir():
+        bundles = compile_directory(target, output_dir)
+    else:
+        bundles = [compile_glasses(target, output_dir)]
+    for bundle in bundles:
+        print(f"Compiled {bundle}")
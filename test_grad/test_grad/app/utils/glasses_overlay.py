@@ -1,17 +1,22 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 import os
 from pathlib import Path
+from .face_mesh_detector import DEFAULT_MAX_EDGE, detect_landmarks, landmarks_to_pixels, load_image
+from .face_mesh_pool import get_face_mesh_pool
+from .compositing import alpha_blend, alpha_blend_premultiplied
+from .glasses_assets import DEFAULT_COMPILED_DIR, find_compiled
+from .asset_cache import get_asset_cache
+from .sprite_cache import get_sprite_cache
 
 class GlassesOverlay:
-    def __init__(self):
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            min_detection_confidence=0.5
-        )
+    def __init__(self, max_edge=DEFAULT_MAX_EDGE, pool=None, compiled_dir=DEFAULT_COMPILED_DIR,
+                 sprites=None, images=None):
+        # Landmarks are detected on a copy bounded to max_edge pixels
+        self.max_edge = max_edge
+        # FaceMesh graphs are borrowed per call, so one overlay can serve
+        # concurrent requests
+        self.pool = pool or get_face_mesh_pool()
         
         # Define eye region landmarks indices for MediaPipe Face Mesh
         self.LEFT_EYE = [33, 133]  # Outer corners of left eye
@@ -26,29 +31,34 @@ class GlassesOverlay:
             "default_glasses.png"
         )
         
-    def get_face_landmarks(self, image):
-        """Get facial landmarks using MediaPipe Face Mesh"""
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_image)
+        # Compiled (trimmed, premultiplied, memory-mapped) glasses bundles
+        self.compiled_dir = compiled_dir
+        
+        # Decoded glasses images, compiled bundles and resized sprites,
+        # shared with the other glasses renderers
+        self.images = images or get_asset_cache()
+        self.sprites = sprites or get_sprite_cache()
         
-        if not results.multi_face_landmarks:
+    def get_face_landmarks(self, image):
+        """Get facial landmarks in full-resolution pixel coordinates"""
+        with self.pool.checkout() as face_mesh:
+            points = detect_landmarks(face_mesh, image, self.max_edge)
+        if points is None:
             return None
             
-        return results.multi_face_landmarks[0].landmark
+        return landmarks_to_pixels(points, image.shape[:2])
         
     def get_eye_coordinates(self, image, landmarks):
-        """Extract eye coordinates from landmarks"""
-        h, w = image.shape[:2]
-        
+        """Extract eye coordinates from pixel-space landmarks"""
         # Get left eye coordinates
         left_eye_points = [
-            (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
+            (int(landmarks[idx, 0]), int(landmarks[idx, 1]))
             for idx in self.LEFT_EYE
         ]
         
         # Get right eye coordinates
         right_eye_points = [
-            (int(landmarks[idx].x * w), int(landmarks[idx].y * h))
+            (int(landmarks[idx, 0]), int(landmarks[idx, 1]))
             for idx in self.RIGHT_EYE
         ]
         
@@ -72,17 +82,32 @@ class GlassesOverlay:
         eye_distance = np.linalg.norm(
             np.array(right_eye_points[0]) - np.array(left_eye_points[0])
         )
-        glasses_width = int(eye_distance * 1.5)
-        
-        # Load and resize glasses image
-        glasses = cv2.imread(glasses_path, cv2.IMREAD_UNCHANGED)
-        if glasses is None:
-            return image, False
-            
-        # Keep aspect ratio when resizing
-        aspect_ratio = glasses.shape[0] / glasses.shape[1]
-        glasses_height = int(glasses_width * aspect_ratio)
-        glasses = cv2.resize(glasses, (glasses_width, glasses_height))
+        # Widths are snapped to the sprite cache grid so repeat fits reuse
+        # an already resized sprite
+        glasses_width, _ = self.sprites.quantize(eye_distance * 1.5)
+        
+        # Prefer the compiled sprite; fall back to decoding the image file
+        asset = self.get_glasses_asset(glasses_path)
+        if asset is not None:
+            # Keep aspect ratio when resizing
+            source_height, source_width = asset.source_size
+            glasses_height = int(glasses_width * source_height / source_width)
+            sprite = self.sprites.get_or_build(
+                self.asset_key(asset), glasses_width, 0.0,
+                lambda width, angle: self.resize_asset(asset, width, glasses_height)
+            )
+        else:
+            try:
+                glasses_key = self.images.version(glasses_path)
+            except OSError:
+                return image, False
+            sprite = self.sprites.get_or_build(
+                glasses_key, glasses_width, 0.0,
+                lambda width, angle: self.resize_glasses(glasses_path, width)
+            )
+            if sprite is None:
+                return image, False
+            glasses_height = sprite.shape[0]
         
         # Calculate position
         center_x = (left_eye_points[0][0] + right_eye_points[0][0]) // 2
@@ -94,34 +119,94 @@ class GlassesOverlay:
         # Ensure coordinates are within image bounds
         x1 = max(0, x1)
         y1 = max(0, y1)
-        x2 = min(image.shape[1], x1 + glasses_width)
-        y2 = min(image.shape[0], y1 + glasses_height)
-        
-        # Adjust glasses crop if needed
-        glasses_crop = glasses[:y2-y1, :x2-x1]
-        
-        # Create mask for transparent overlay
-        if glasses.shape[2] == 4:  # With alpha channel
-            mask = glasses_crop[:, :, 3] / 255.0
-            for c in range(3):
-                image[y1:y2, x1:x2, c] = (
-                    image[y1:y2, x1:x2, c] * (1 - mask) +
-                    glasses_crop[:, :, c] * mask
-                )
-        else:  # Without alpha channel
-            image[y1:y2, x1:x2] = glasses_crop
+        
+        if asset is not None:
+            # Only the non-empty part of the sprite was resized; blend it at
+            # its offset inside the full frame
+            if sprite is not None:
+                color, alpha, offset_x, offset_y = sprite
+                alpha_blend_premultiplied(image, color, alpha, x1 + offset_x, y1 + offset_y)
+        else:
+            # Blend using the alpha channel (if any), cropped to the image
+            alpha_blend(image, sprite, x1, y1)
             
         return image, True
 
-    def process_image(self, image_path, glasses_path=None):
-        """Process an image file and return the result"""
+    def get_glasses_asset(self, glasses_path):
+        """Return the up-to-date compiled bundle for glasses_path, or None"""
+        bundle = find_compiled(glasses_path, self.compiled_dir)
+        if bundle is None:
+            return None
+        return self.images.get_compiled(bundle)
+        
+    @staticmethod
+    def asset_key(asset):
+        """Sprite cache key of a compiled bundle; changes with its source image"""
+        signature = asset.meta["source_signature"]
+        return ("compiled", asset.meta["source"], signature["mtime_ns"], signature["size"])
+        
+    def resize_glasses(self, glasses_path, width):
+        """Resize a (cached) glasses image to width, keeping aspect ratio"""
+        glasses = self.images.get(glasses_path)
+        if glasses is None:
+            return None
+        height = int(width * glasses.shape[0] / glasses.shape[1])
+        return cv2.resize(glasses, (width, height))
+        
+    @staticmethod
+    def resize_asset(asset, width, height):
+        """Resize the trimmed part of a compiled sprite for a (width, height) frame
+
+        Returns (color, alpha, offset_x, offset_y), the offsets locating the
+        trimmed sprite inside the frame, or None for an empty sprite.
+        """
+        bbox_x, bbox_y, bbox_w, bbox_h = asset.bbox
+        if bbox_w == 0 or bbox_h == 0:
+            return None
+        source_height, source_width = asset.source_size
+        scale_x = width / source_width
+        scale_y = height / source_height
+        
+        # Resample the trimmed planes with the full frame's pixel grid, so the
+        # result lines up exactly with resizing the untrimmed image
+        offset_x = int(np.floor(bbox_x * scale_x))
+        offset_y = int(np.floor(bbox_y * scale_y))
+        size = (
+            max(1, int(np.ceil((bbox_x + bbox_w) * scale_x)) - offset_x),
+            max(1, int(np.ceil((bbox_y + bbox_h) * scale_y)) - offset_y)
+        )
+        matrix = np.float32([
+            [scale_x, 0, scale_x * (bbox_x + 0.5) - 0.5 - offset_x],
+            [0, scale_y, scale_y * (bbox_y + 0.5) - 0.5 - offset_y]
+        ])
+        return (
+            cv2.warpAffine(np.asarray(asset.color), matrix, size),
+            cv2.warpAffine(np.asarray(asset.alpha), matrix, size),
+            offset_x,
+            offset_y
+        )
+
+    def process_image(self, image, glasses_path=None):
+        """Process an image and return the result
+
+        image may be a file path, encoded image bytes (or any buffer) or a
+        decoded BGR ndarray, which is left untouched.
+        """
         # Read input image
-        image = cv2.imread(str(image_path))
+        source = image
+        try:
+            image, _ = load_image(source)
+        except OSError:
+            image = None
         if image is None:
             raise ValueError("Could not read input image")
             
+        # Only copy arrays the caller still owns
+        if image is source:
+            image = image.copy()
+            
         # Apply glasses overlay
-        result, success = self.overlay_glasses(image.copy(), glasses_path)
+        result, success = self.overlay_glasses(image, glasses_path)
         
         if not success:
             raise ValueError("Could not detect face or apply glasses")
@@ -2,9 +2,12 @@ import cv2
 import numpy as np
 from pathlib import Path
 import logging
+from .compositing import alpha_blend
+from .asset_cache import get_asset_cache
+from .sprite_cache import get_sprite_cache
 
 class GlassesProcessor:
-    def __init__(self):
+    def __init__(self, sprites=None, images=None):
         # Directory containing glasses styles
         self.glasses_dir = Path(__file__).parent.parent / "assets" / "glasses"
         self.glasses_dir.mkdir(parents=True, exist_ok=True)
@@ -15,8 +18,12 @@ class GlassesProcessor:
             self.create_dummy_glasses(self.glasses_dir / "2.png", "round")
             self.create_dummy_glasses(self.glasses_dir / "3.png", "sunglasses")
         
-        # Cache for loaded glasses images
-        self.glasses_cache = {}
+        # Decoded glasses images, bounded and reloaded when a file changes;
+        # shared with the other glasses renderers
+        self.glasses_cache = images or get_asset_cache()
+        
+        # Resized sprites, shared with the other glasses renderers
+        self.sprites = sprites or get_sprite_cache()
         
     def create_dummy_glasses(self, path, style="rectangular"):
         """Create a simple glasses overlay for testing with different styles"""
@@ -40,49 +47,55 @@ class GlassesProcessor:
         cv2.imwrite(str(path), glasses)
         logging.info(f"Created dummy glasses style '{style}' at {path}")
 
+    def get_glasses_path(self, glasses_id):
+        """Resolve a glasses style ID to its image file"""
+        glasses_path = self.glasses_dir / f"{glasses_id}.png"
+        if not glasses_path.exists():
+            logging.warning(f"Glasses style {glasses_id} not found, using default style")
+            glasses_path = self.glasses_dir / "1.png"
+        return str(glasses_path)
+
     def get_glasses_image(self, glasses_id):
         """Load a specific glasses style by ID"""
         try:
-            glasses_id = str(glasses_id)  # Convert to string for path operations
-            if glasses_id in self.glasses_cache:
-                return self.glasses_cache[glasses_id]
-            
-            glasses_path = self.glasses_dir / f"{glasses_id}.png"
-            if not glasses_path.exists():
-                logging.warning(f"Glasses style {glasses_id} not found, using default style")
-                glasses_path = self.glasses_dir / "1.png"
-            
-            image = cv2.imread(str(glasses_path), cv2.IMREAD_UNCHANGED)
+            glasses_path = self.get_glasses_path(str(glasses_id))
+            image = self.glasses_cache.get(glasses_path)
             if image is None:
                 raise RuntimeError(f"Failed to load glasses image from {glasses_path}")
             
-            self.glasses_cache[glasses_id] = image
             return image
         except Exception as e:
             logging.error(f"Error loading glasses style {glasses_id}: {str(e)}")
             raise
 
+    def resize_glasses(self, glasses_path, width):
+        """Resize a glasses image to width, maintaining its aspect ratio"""
+        glasses_image = self.glasses_cache.get(glasses_path)
+        if glasses_image is None:
+            raise RuntimeError(f"Failed to load glasses image from {glasses_path}")
+        aspect_ratio = glasses_image.shape[0] / glasses_image.shape[1]
+        return cv2.resize(glasses_image, (width, int(width * aspect_ratio)))
+
     def process(self, image, face_data, models, glasses_id="1"):
         """Process image with face detection and add virtual glasses"""
         try:
-            # Load the selected glasses style
-            glasses_image = self.get_glasses_image(glasses_id)
+            # Resolve the selected glasses style
+            glasses_path = self.get_glasses_path(str(glasses_id))
             
             # Extract face and eye coordinates
             face_x, face_y, face_w, face_h = face_data['face']
             left_eye = face_data['left_eye']
             right_eye = face_data['right_eye']
             
-            # Calculate glasses dimensions based on eye positions
+            # Calculate glasses dimensions based on eye positions; the resized
+            # style is cached per file version, so repeat fits at a similar
+            # size skip resampling
             eye_distance = right_eye[0] - left_eye[0]
-            glasses_width = int(eye_distance * 1.5)
-            
-            # Maintain aspect ratio
-            aspect_ratio = glasses_image.shape[0] / glasses_image.shape[1]
-            glasses_height = int(glasses_width * aspect_ratio)
-            
-            # Resize glasses
-            glasses = cv2.resize(glasses_image, (glasses_width, glasses_height))
+            glasses = self.sprites.get_or_build(
+                self.glasses_cache.version(glasses_path), eye_distance * 1.5, 0.0,
+                lambda width, angle: self.resize_glasses(glasses_path, width)
+            )
+            glasses_height, glasses_width = glasses.shape[:2]
             
             # Calculate position
             glasses_x = face_x + left_eye[0] - int(glasses_width * 0.2)
@@ -96,18 +109,7 @@ class GlassesProcessor:
             result = image.copy()
             
             # Handle alpha channel for transparency
-            if glasses.shape[2] == 4:
-                alpha_channel = glasses[:, :, 3] / 255.0
-                for c in range(3):
-                    result[glasses_y:glasses_y+glasses_height, 
-                          glasses_x:glasses_x+glasses_width, c] = \
-                        image[glasses_y:glasses_y+glasses_height, 
-                             glasses_x:glasses_x+glasses_width, c] * (1 - alpha_channel) + \
-                        glasses[:, :, c] * alpha_channel
-            else:
-                # No alpha channel, simple overlay
-                result[glasses_y:glasses_y+glasses_height, 
-                      glasses_x:glasses_x+glasses_width] = glasses[:, :, :3]
+            alpha_blend(result, glasses, glasses_x, glasses_y)
             
             return result
             
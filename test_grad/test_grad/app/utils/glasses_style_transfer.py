@@ -1,58 +1,75 @@
 import os
-import sys
 import cv2
-import numpy as np
-import torch
-import torchvision.transforms as transforms
-from PIL import Image
+from .compositing import alpha_blend
+from .asset_cache import get_asset_cache
+from .resource_registry import acquire_generator, haar_cascade, release_generator
+from ..models.artifacts import GENERATOR_BACKEND
+from ..models.batch_scheduler import InferenceScheduler
+from ..models.onnx_generator import resize_short_side, to_image, to_input
+from ..models.tensor_io import bgr_to_tensor, nchw_to_rgb
+
+# torch, torchvision and PIL are imported only by the torch backend, so the
+# ONNX backend starts without them
 
 class GlassesStyleTransfer:
-    def __init__(self):
-        # Load face and eye detection cascades
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+    def __init__(self, backend=None, precision=None):
+        # 'torch' (eager or frozen TorchScript) or 'onnx'
+        self.backend = backend or GENERATOR_BACKEND
+        # Torch backend only: 'fp32', 'int8' or 'bf16'
+        self.precision = precision
+        self.requested_precision = precision
+        
+        # Face and eye detection cascades, shared process-wide
+        self.face_cascade = haar_cascade("haarcascade_frontalface_default.xml")
+        self.eye_cascade = haar_cascade("haarcascade_eye.xml")
         
         # Set model path relative to this file
         current_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.model_path = os.path.join(current_dir, "83_net_G_A.pth")
         print(f"Looking for model at: {self.model_path}")
         
-        # Load the model
+        # Load the model; concurrent calls share batched forward passes
         self.netG = self.load_model()
+        self.scheduler = InferenceScheduler(
+            self.netG, name='style_transfer', memory_format=self.prepare_model(self.netG)
+        )
 
     def load_model(self):
-        try:
-            # Add the parent directory to sys.path to find test_real_image
-            parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            if parent_dir not in sys.path:
-                sys.path.append(parent_dir)
-                
-            from test_real_image import ResnetGenerator
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found at {self.model_path}")
             
-            if not os.path.exists(self.model_path):
-                raise FileNotFoundError(f"Model file not found at {self.model_path}")
-                
-            netG = ResnetGenerator()
+        if self.backend == "onnx":
+            netG, _ = acquire_generator(self.model_path, None, self.backend)
+            return netG
             
-            # Load model with CPU fallback
-            try:
-                if torch.cuda.is_available():
-                    state_dict = torch.load(self.model_path)
-                else:
-                    state_dict = torch.load(self.model_path, map_location=torch.device("cpu"))
-            except RuntimeError as e:
-                print(f"Error loading model: {e}")
-                state_dict = torch.load(self.model_path, map_location=torch.device("cpu"))
-                
-            netG.load_state_dict(state_dict)
-            netG.eval()
+        try:
+            from ..models.resnet_generator import ResnetGenerator
+            
+            # Runs on CPU in the selected precision (fp32 uses the frozen
+            # TorchScript artifact when one was built); shared with any
+            # ModelLoader in the process
+            netG, self.precision = acquire_generator(
+                self.model_path, ResnetGenerator, self.backend, self.precision, "cpu"
+            )
             return netG
             
         except ImportError as e:
-            raise ImportError(f"Could not import ResnetGenerator: {e}. Make sure test_real_image.py is in the correct location.")
+            raise ImportError(f"Could not import ResnetGenerator: {e}")
         except Exception as e:
             raise Exception(f"Error loading model: {e}")
 
+    def close(self):
+        """Stop batching and release the shared generator"""
+        self.scheduler.close()
+        release_generator(self.model_path, self.backend, self.requested_precision)
+
+    def prepare_model(self, netG):
+        """Apply the shared CPU inference settings; returns the input memory format"""
+        if self.backend == "onnx":
+            return None
+        from ..models.inference_config import get_inference_config
+        return get_inference_config().prepare(netG)
+
     def detect_face_and_eyes(self, image):
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
@@ -93,30 +110,15 @@ class GlassesStyleTransfer:
         return image[eye_y:eye_y+eye_h, eye_x:eye_x+eye_w], (eye_x, eye_y, eye_w, eye_h)
 
     def apply_style_transfer(self, image_region):
-        # Convert to RGB for processing
-        image_rgb = cv2.cvtColor(image_region, cv2.COLOR_BGR2RGB)
-        image_pil = Image.fromarray(image_rgb)
-        
         # Remember original size
         original_size = image_region.shape[:2][::-1]  # width, height
         
-        # Apply transformations
-        transform = transforms.Compose([
-            transforms.Resize(256),
-            transforms.ToTensor(),
-            transforms.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
-        ])
-        
-        image_tensor = transform(image_pil).unsqueeze(0)
-        
-        # Generate styled image
-        with torch.no_grad():
-            output = self.netG(image_tensor)
-        
-        # Convert back to image
-        output = output.squeeze().cpu().float().numpy()
-        output = (np.transpose(output, (1, 2, 0)) + 1) / 2.0 * 255.0
-        output = output.astype(np.uint8)
+        if self.backend == "onnx":
+            # Same resize/normalisation as the torch path, in numpy
+            output = self.scheduler.infer(to_input(image_region, 256))
+            output = to_image(output)
+        else:
+            output = self._torch_style_transfer(image_region)
         
         # Convert back to BGR and resize to original size
         output = cv2.cvtColor(output, cv2.COLOR_RGB2BGR)
@@ -124,6 +126,18 @@ class GlassesStyleTransfer:
         
         return output
 
+    def _torch_style_transfer(self, image_region):
+        """Run the torch generator on a BGR region; returns an RGB uint8 image"""
+        # Same resize as torchvision's Resize(256), then one fused pass to
+        # a normalized RGB tensor
+        image_tensor = bgr_to_tensor(resize_short_side(image_region, 256))
+        
+        # Generate styled image (batched with same-sized concurrent regions)
+        output = self.scheduler.infer(image_tensor)
+        
+        # Convert back to image
+        return nchw_to_rgb(output)
+
     def overlay_glasses_with_style(self, image, glasses_path):
         # Detect face and eyes
         face, left_eye, right_eye = self.detect_face_and_eyes(image)
@@ -134,8 +148,8 @@ class GlassesStyleTransfer:
         # Get eye region
         eye_region, (ex, ey, ew, eh) = self.get_eye_region(image, face, left_eye, right_eye)
         
-        # Load glasses image
-        glasses_img = cv2.imread(glasses_path, cv2.IMREAD_UNCHANGED)
+        # Load glasses image (decoded once and shared across requests)
+        glasses_img = get_asset_cache().get(glasses_path)
         if glasses_img is None:
             print(f"Could not load glasses image: {glasses_path}")
             return None, False
@@ -147,24 +161,20 @@ class GlassesStyleTransfer:
             # Apply style transfer to eye region
             styled_region = self.apply_style_transfer(eye_region)
             
-            # Create mask from glasses
             # Ensure glasses_resized is in the correct format
+            alpha = None
             if len(glasses_resized.shape) == 3 and glasses_resized.shape[2] == 4:  # If glasses image has alpha channel
-                alpha = glasses_resized[:, :, 3] / 255.0
+                alpha = glasses_resized[:, :, 3]
                 glasses_rgb = glasses_resized[:, :, :3]
             else:
-                alpha = np.ones((eh, ew))
                 glasses_rgb = glasses_resized if len(glasses_resized.shape) == 3 else cv2.cvtColor(glasses_resized, cv2.COLOR_GRAY2BGR)
             
-            # Create 3-channel alpha mask
-            alpha_3channel = np.stack([alpha] * 3, axis=2)
-            
             # Blend the images using the alpha mask
             blended = cv2.addWeighted(styled_region, 0.7, glasses_rgb, 0.3, 0)
             result = image.copy()
             
             # Apply the blended region only where the glasses should be (using alpha mask)
-            result[ey:ey+eh, ex:ex+ew] = alpha_3channel * blended + (1 - alpha_3channel) * result[ey:ey+eh, ex:ex+ew]
+            alpha_blend(result, blended, ex, ey, alpha=alpha)
             
             return result, True
             
@@ -0,0 +1,230 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Heavy objects (generators, Haar cascades, FaceMesh graphs) are loaded once
+# per process through the registry and shared by every component that asks
+# for them. Nothing here imports torch or mediapipe until a loader runs.
+
+
+class _Entry:
+    def __init__(self, loader, close):
+        self.loader = loader
+        self.close = close
+        self.value = None
+        self.loaded = False
+        self.refs = 0
+        self.loads = 0
+        self.load_ms = None
+        self.last_used = None
+        self.lock = threading.Lock()
+
+
+class ResourceRegistry:
+    """Lazy, thread-safe, load-once store of shared resources
+
+    acquire() loads a resource on first use and counts a reference;
+    release() drops it. Unloading only touches resources nobody holds
+    (unless forced), and a later acquire() loads them again.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, name, loader, close):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                if loader is None:
+                    raise KeyError(f"Unknown resource {name!r}")
+                entry = self.entries[name] = _Entry(loader, close)
+            return entry
+
+    def _load(self, name, entry):
+        # Per-entry lock: loading one resource never blocks the others
+        with entry.lock:
+            if not entry.loaded:
+                started = time.perf_counter()
+                entry.value = entry.loader()
+                entry.load_ms = (time.perf_counter() - started) * 1000
+                entry.loads += 1
+                entry.loaded = True
+                logger.info(f"Loaded {name} in {entry.load_ms:.1f} ms")
+            entry.last_used = time.time()
+            return entry.value
+
+    def get(self, name, loader=None, close=None):
+        """The resource, loaded if needed, without taking a reference"""
+        entry = self._entry(name, loader, close)
+        return self._load(name, entry)
+
+    def acquire(self, name, loader=None, close=None):
+        """The resource, loaded if needed; pair with release(name)"""
+        entry = self._entry(name, loader, close)
+        with entry.lock:
+            entry.refs += 1
+        try:
+            return self._load(name, entry)
+        except Exception:
+            with entry.lock:
+                entry.refs -= 1
+            raise
+
+    def release(self, name):
+        entry = self.entries.get(name)
+        if entry is not None:
+            with entry.lock:
+                entry.refs = max(0, entry.refs - 1)
+
+    @contextmanager
+    def use(self, name, loader=None, close=None):
+        """Hold a reference for the duration of a with-block"""
+        value = self.acquire(name, loader, close)
+        try:
+            yield value
+        finally:
+            self.release(name)
+
+    def unload(self, name, force=False):
+        """Drop a loaded resource; returns False if it is still referenced"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        with entry.lock:
+            if not entry.loaded or (entry.refs and not force):
+                return False
+            value, entry.value, entry.loaded = entry.value, None, False
+        if entry.close is not None:
+            entry.close(value)
+        logger.info(f"Unloaded {name}")
+        return True
+
+    def unload_unused(self):
+        """Unload every resource with no references; returns their names"""
+        with self.lock:
+            names = list(self.entries)
+        return [name for name in names if self.unload(name)]
+
+    def stats(self):
+        """Per resource: resident, references, load count and last load time"""
+        with self.lock:
+            entries = dict(self.entries)
+        return {
+            name: {
+                'loaded': entry.loaded,
+                'refs': entry.refs,
+                'loads': entry.loads,
+                'load_ms': round(entry.load_ms, 2) if entry.load_ms is not None else None,
+                'last_used': entry.last_used
+            }
+            for name, entry in sorted(entries.items())
+        }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide resource registry"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ResourceRegistry()
+    return _default_registry
+
+
+class ThreadLocalCascade:
+    """A Haar cascade with one cv2.CascadeClassifier per thread
+
+    detectMultiScale keeps per-image evaluator state on the classifier, so
+    one instance must not be used by several threads at once. The XML is
+    parsed once per thread that uses the cascade.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def classifier(self):
+        classifier = getattr(self.local, 'classifier', None)
+        if classifier is None:
+            classifier = self.local.classifier = cv2.CascadeClassifier(self.path)
+        return classifier
+
+    def empty(self):
+        return self.classifier().empty()
+
+    def detectMultiScale(self, *args, **kwargs):
+        return self.classifier().detectMultiScale(*args, **kwargs)
+
+
+def _load_cascade(filename):
+    cascade = ThreadLocalCascade(cv2.data.haarcascades + filename)
+    if cascade.empty():
+        logger.warning(f"Could not load Haar cascade {filename}")
+    return cascade
+
+
+def haar_cascade(filename):
+    """Shared Haar cascade from OpenCV's data directory, held for the process lifetime
+
+    Safe to call from any thread: each thread gets its own classifier.
+    """
+    return get_registry().acquire(f"cascade:{filename}", lambda: _load_cascade(filename))
+
+
+def generator_name(checkpoint_path, backend=None, precision=None, device='cpu'):
+    """Registry name of a generator; the torch generator classes share one layout"""
+    from ..models.artifacts import GENERATOR_BACKEND
+    backend = backend or GENERATOR_BACKEND
+    if backend == 'onnx':
+        precision = None
+    else:
+        precision = precision or os.environ.get('GENERATOR_PRECISION', 'fp32')
+    return f"generator:{backend}:{precision}:{device}:{os.path.abspath(checkpoint_path)}"
+
+
+def _load_generator(checkpoint_path, model_factory, backend, precision, device):
+    if backend == 'onnx':
+        from ..models.onnx_generator import load_onnx_generator
+        model = load_onnx_generator(checkpoint_path)
+        if model is None:
+            raise FileNotFoundError(
+                f"No ONNX export of {checkpoint_path}; run python -m app.models.onnx_generator"
+            )
+        return model, None
+    from ..models.precision import load_generator_with_precision
+    return load_generator_with_precision(checkpoint_path, model_factory, precision, device)
+
+
+def acquire_generator(checkpoint_path, model_factory, backend=None, precision=None, device='cpu'):
+    """Shared G_A-style generator; returns (model, precision used or None for ONNX)
+
+    Pair with release_generator() using the same arguments.
+    """
+    from ..models.artifacts import GENERATOR_BACKEND
+    backend = backend or GENERATOR_BACKEND
+    name = generator_name(checkpoint_path, backend, precision, device)
+    return get_registry().acquire(
+        name, lambda: _load_generator(checkpoint_path, model_factory, backend, precision, device)
+    )
+
+
+def release_generator(checkpoint_path, backend=None, precision=None, device='cpu'):
+    get_registry().release(generator_name(checkpoint_path, backend, precision, device))
+
+
+def acquire_face_mesh_pool():
+    """The shared FaceMesh pool; unloading it closes its idle graphs"""
+    def load():
+        from .face_mesh_pool import get_face_mesh_pool
+        return get_face_mesh_pool()
+    return get_registry().acquire('face_mesh_pool', load, close=lambda pool: pool.close())
@@ -0,0 +1,125 @@
+import os
+import cv2
+import numpy as np
+from ..models.tensor_io import bgr_to_nchw
+
+# Only the eye band changes under the glasses generator, so ROI mode runs it
+# on a padded eye/brow crop and blends the result into the untouched photo.
+# ROI_PADDING: padding around the landmark box, as a fraction of its width
+# ROI_MAX_EDGE: longest side the crop is resized to before inference
+# ROI_FEATHER: width of the blend ramp, as a fraction of the crop's short side
+DEFAULT_PADDING = float(os.environ.get('ROI_PADDING', '0.25'))
+DEFAULT_MAX_EDGE = int(os.environ.get('ROI_MAX_EDGE', '256'))
+DEFAULT_FEATHER = float(os.environ.get('ROI_FEATHER', '0.2'))
+
+# FaceMesh indices outlining both eyes, both brows and the nose bridge
+EYE_REGION_LANDMARKS = [
+    # Left eye and brow
+    33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246,
+    70, 63, 105, 66, 107, 46, 53, 52, 65, 55,
+    # Right eye and brow
+    362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398,
+    300, 293, 334, 296, 336, 276, 283, 282, 295, 285,
+    # Nose bridge and temples
+    6, 168, 197, 127, 356
+]
+
+# The generator downsamples twice by 2, so inputs whose sides are multiples
+# of 4 come back at exactly the same size
+SIZE_MULTIPLE = 4
+
+
+def eye_region_box(points_px, image_shape, padding=DEFAULT_PADDING):
+    """Padded (x1, y1, x2, y2) box around the eye/brow landmarks, clipped to the image"""
+    region = points_px[EYE_REGION_LANDMARKS, :2]
+    x1, y1 = region.min(axis=0)
+    x2, y2 = region.max(axis=0)
+    # Pad by the box width on both axes: the band is much wider than tall
+    # and frames need room above the brows and below the eyes
+    pad = padding * (x2 - x1)
+    height, width = image_shape[:2]
+    x1 = max(0, int(np.floor(x1 - pad)))
+    y1 = max(0, int(np.floor(y1 - pad)))
+    x2 = min(width, int(np.ceil(x2 + pad)))
+    y2 = min(height, int(np.ceil(y2 + pad)))
+    if x2 - x1 < SIZE_MULTIPLE or y2 - y1 < SIZE_MULTIPLE:
+        return None
+    return x1, y1, x2, y2
+
+
+def inference_size(width, height, max_edge=DEFAULT_MAX_EDGE):
+    """(width, height) to run a crop at: longest side at most max_edge, multiples of 4"""
+    scale = min(1.0, max_edge / max(width, height))
+    def fit(n):
+        return max(SIZE_MULTIPLE, int(round(n * scale / SIZE_MULTIPLE)) * SIZE_MULTIPLE)
+    return fit(width), fit(height)
+
+
+def feather_mask(height, width, feather, fade=(True, True, True, True)):
+    """(H, W, 1) float32 weights: 1 inside, easing to 0 over `feather` px
+
+    fade says which of the (left, top, right, bottom) edges ease out; an
+    edge on the image border has nothing to blend into and stays at 1.
+    """
+    left, top, right, bottom = fade
+    def ramp(n, start, end):
+        index = np.arange(n, dtype=np.float32)
+        distance = np.full(n, np.inf, np.float32)
+        if start:
+            distance = np.minimum(distance, index)
+        if end:
+            distance = np.minimum(distance, index[::-1])
+        t = np.clip(distance / max(feather, 1.0), 0.0, 1.0)
+        return t * t * (3.0 - 2.0 * t)
+    return np.outer(ramp(height, top, bottom), ramp(width, left, right))[:, :, None]
+
+
+def to_input(crop_bgr, size):
+    """BGR uint8 crop -> (1, 3, H, W) float32 in [-1, 1] at size (width, height)"""
+    if (crop_bgr.shape[1], crop_bgr.shape[0]) != size:
+        crop_bgr = cv2.resize(crop_bgr, size, interpolation=cv2.INTER_AREA)
+    return bgr_to_nchw(crop_bgr)
+
+
+def to_bgr(output, size):
+    """(1, 3, H, W) generator output in [-1, 1] -> BGR float32 image at size (width, height)"""
+    rgb = (np.transpose(output[0], (1, 2, 0)) + 1.0) * 127.5
+    bgr = np.ascontiguousarray(np.clip(rgb, 0, 255)[:, :, ::-1])
+    if (bgr.shape[1], bgr.shape[0]) != size:
+        bgr = cv2.resize(bgr, size, interpolation=cv2.INTER_CUBIC)
+    return bgr
+
+
+def apply_roi(image_bgr, box, netG, max_edge=DEFAULT_MAX_EDGE, feather=DEFAULT_FEATHER):
+    """Run netG on the box of a BGR image and feather-blend it back in place
+
+    netG maps a float32 NCHW array in [-1, 1] to an array of the same
+    shape. Pixels outside the box are returned untouched, at full
+    resolution. Returns a new BGR uint8 image.
+    """
+    x1, y1, x2, y2 = box
+    crop = image_bgr[y1:y2, x1:x2]
+    height, width = crop.shape[:2]
+
+    generated = to_bgr(netG(to_input(crop, inference_size(width, height, max_edge))), (width, height))
+
+    fade = (x1 > 0, y1 > 0, x2 < image_bgr.shape[1], y2 < image_bgr.shape[0])
+    mask = feather_mask(height, width, feather * min(height, width), fade)
+
+    output = image_bgr.copy()
+    blended = crop.astype(np.float32) * (1.0 - mask) + generated * mask
+    output[y1:y2, x1:x2] = np.clip(blended + 0.5, 0, 255).astype(np.uint8)
+    return output
+
+
+def detect_eye_region(image_bgr, padding=DEFAULT_PADDING, pool=None):
+    """Eye/brow box of the first face in a BGR image, or None if no face is found"""
+    from .face_mesh_detector import detect_landmarks, landmarks_to_pixels
+    if pool is None:
+        from .face_mesh_pool import get_face_mesh_pool
+        pool = get_face_mesh_pool()
+    with pool.checkout() as face_mesh:
+        points = detect_landmarks(face_mesh, image_bgr)
+    if points is None:
+        return None
+    return eye_region_box(landmarks_to_pixels(points, image_bgr.shape[:2]), image_bgr.shape, padding)
@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_SPRITE_CACHE_BYTES = int(float(os.environ.get('GLASSES_SPRITE_CACHE_MB', '64')) * 2**20)
+DEFAULT_WIDTH_STEP = int(os.environ.get('GLASSES_SPRITE_WIDTH_STEP', '4'))
+DEFAULT_ANGLE_STEP = float(os.environ.get('GLASSES_SPRITE_ANGLE_STEP', '1.0'))
+
+
+def sprite_nbytes(sprite):
+    """Bytes held by a sprite: an array or a tuple of arrays (and scalars)"""
+    if isinstance(sprite, tuple):
+        return sum(getattr(part, 'nbytes', 0) for part in sprite)
+    return sprite.nbytes
+
+
+def _freeze(sprite):
+    """Make cached arrays read-only so a caller cannot corrupt shared sprites"""
+    parts = sprite if isinstance(sprite, tuple) else (sprite,)
+    for part in parts:
+        if hasattr(part, 'setflags'):
+            part.setflags(write=False)
+    return sprite
+
+
+class SpriteCache:
+    """LRU cache of ready-to-blend glasses sprites, bounded by total bytes
+
+    Sprites are keyed by (glasses key, width, angle) after snapping the
+    width to a multiple of ``width_step`` pixels and the roll angle to a
+    multiple of ``angle_step`` degrees, so nearby fits share one resampled
+    sprite. The glasses key should change whenever the source image does,
+    e.g. the version token from AssetCache.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_SPRITE_CACHE_BYTES,
+                 width_step=DEFAULT_WIDTH_STEP, angle_step=DEFAULT_ANGLE_STEP):
+        self.max_bytes = max_bytes
+        self.width_step = max(1, int(width_step))
+        self.angle_step = angle_step
+        self.sprites = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, width, angle=0.0):
+        """Snap a fit to the cache grid; returns (width, angle)"""
+        width = max(self.width_step, int(round(width / self.width_step)) * self.width_step)
+        if self.angle_step:
+            angle = round(angle / self.angle_step) * self.angle_step
+        return width, float(angle)
+
+    def get_or_build(self, glasses_key, width, angle, build):
+        """Return the sprite for a fit, calling build(width, angle) on a miss
+
+        build receives the quantized width and angle. A None result is
+        returned as-is and not cached.
+        """
+        width, angle = self.quantize(width, angle)
+        key = (glasses_key, width, angle)
+        with self.lock:
+            sprite = self.sprites.get(key)
+            if sprite is not None:
+                self.sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+
+        # Resample outside the lock; a concurrent miss on the same key just
+        # builds the sprite twice
+        sprite = build(width, angle)
+        if sprite is None:
+            return None
+        self.put(key, _freeze(sprite))
+        return sprite
+
+    def put(self, key, sprite):
+        size = sprite_nbytes(sprite)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.sprites.pop(key, None)
+            if previous is not None:
+                self.bytes -= sprite_nbytes(previous)
+            self.sprites[key] = sprite
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.sprites.popitem(last=False)
+                self.bytes -= sprite_nbytes(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.sprites.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Entry count, byte usage and hit rate"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.sprites),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_sprite_cache():
+    """Process-wide sprite cache shared by every glasses renderer"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = SpriteCache()
+    return _default_cache
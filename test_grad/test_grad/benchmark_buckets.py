@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import numpy as np
+import torch
+from app.models.model_loader import ModelArchitecture
+from app.models.precision import load_generator_with_precision
+from app.models.batch_scheduler import InferenceScheduler
+from app.models.tensor_io import nchw_to_bgr
+
+# Long sides of Resize(256) outputs for common photo aspect ratios
+# (1:1, 5:4, 4:3, 3:2, 16:9, ...) in both orientations
+LONG_SIDES = [256, 320, 341, 384, 455, 288, 300, 360]
+
+
+def request_shapes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    shapes = []
+    for _ in range(count):
+        long_side = int(rng.choice(LONG_SIDES))
+        shapes.append((256, long_side) if rng.random() < 0.5 else (long_side, 256))
+    return shapes
+
+
+def psnr(reference, image):
+    mse = np.mean((reference.astype(np.float64) - image.astype(np.float64)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(model, inputs, bucketing, wave):
+    """Submit inputs in concurrent waves; returns (seconds, outputs, scheduler stats)"""
+    scheduler = InferenceScheduler(model, max_batch_size=wave, max_wait_ms=20, bucketing=bucketing)
+    started = time.perf_counter()
+    outputs = []
+    for start in range(0, len(inputs), wave):
+        futures = [scheduler.submit(x) for x in inputs[start:start + wave]]
+        outputs.extend(future.result() for future in futures)
+    elapsed = time.perf_counter() - started
+    stats = scheduler.stats()
+    scheduler.close()
+    return elapsed, outputs, stats
+
+
+def main(checkpoint_path, count=32, wave=8):
+    model, _ = load_generator_with_precision(checkpoint_path, ModelArchitecture, 'fp32')
+    inputs = [torch.rand(1, 3, *shape) * 2 - 1 for shape in request_shapes(count)]
+    print(f"{count} requests in waves of {wave}, {torch.get_num_threads()} threads")
+
+    results = {}
+    print(f"{'bucketing':>9} {'seconds':>8} {'req/s':>7} {'passes':>7} {'shapes':>7} {'PSNR dB':>8}")
+    for bucketing in (False, True):
+        elapsed, outputs, stats = run(model, inputs, bucketing, wave)
+        results[bucketing] = [nchw_to_bgr(output) for output in outputs]
+        # Pooled over all pixels: inputs already on the bucket grid match exactly
+        quality = psnr(np.concatenate([r.ravel() for r in results[False]]),
+                       np.concatenate([o.ravel() for o in results[bucketing]]))
+        print(f"{str(bucketing):>9} {elapsed:8.2f} {count / elapsed:7.2f} {stats['batches']:7d} "
+              f"{len(stats['shape_histogram']):7d} {quality:8.2f}")
+
+
+if __name__ == "__main__":
+    default_checkpoint = os.path.join(os.path.dirname(os.path.abspath(__file__)), '83_net_G_A.pth')
+    main(sys.argv[1] if len(sys.argv) > 1 else default_checkpoint,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 8)
@@ -0,0 +1,91 @@
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from app.utils.compositing import alpha_blend
+
+
+def make_glasses(width=800, height=300):
+    """Draw the same sprite as create_default_glasses.py, in BGRA"""
+    glasses = np.zeros((height, width, 4), dtype=np.uint8)
+    frame = (0, 0, 0, 255)
+    cv2.ellipse(glasses, (200, 150), (100, 50), 0, 0, 360, (0, 0, 0, 64), -1)
+    cv2.ellipse(glasses, (600, 150), (100, 50), 0, 0, 360, (0, 0, 0, 64), -1)
+    cv2.ellipse(glasses, (200, 150), (100, 50), 0, 0, 360, frame, 3)
+    cv2.ellipse(glasses, (600, 150), (100, 50), 0, 0, 360, frame, 3)
+    cv2.line(glasses, (300, 150), (500, 150), frame, 3)
+    cv2.line(glasses, (100, 150), (50, 130), frame, 3)
+    cv2.line(glasses, (700, 150), (750, 130), frame, 3)
+    return glasses
+
+
+def loop_blend(image, glasses, x_offset, y_offset):
+    """The original per-pixel loop from tryon_glasses_mediapipe.py"""
+    img_height, img_width = image.shape[:2]
+    for y in range(glasses.shape[0]):
+        for x in range(glasses.shape[1]):
+            if (y_offset + y < 0 or y_offset + y >= img_height or
+                x_offset + x < 0 or x_offset + x >= img_width):
+                continue
+            alpha = glasses[y, x, 3] / 255.0 if glasses.shape[2] == 4 else 1.0
+            if alpha > 0:
+                image[y_offset + y, x_offset + x] = (
+                    (1 - alpha) * image[y_offset + y, x_offset + x] + alpha * glasses[y, x, :3]
+                )
+    return image
+
+
+def float_blend(image, glasses, x, y):
+    """The float64 NumPy blend previously used by GlassesOverlay"""
+    h, w = glasses.shape[:2]
+    mask = glasses[:, :, 3] / 255.0
+    for c in range(3):
+        image[y:y+h, x:x+w, c] = image[y:y+h, x:x+w, c] * (1 - mask) + glasses[:, :, c] * mask
+    return image
+
+
+def timed(fn, base, repeats):
+    """Return (median seconds, peak temporary bytes, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        image = base.copy()
+        started = time.perf_counter()
+        result = fn(image)
+        timings.append(time.perf_counter() - started)
+
+    image = base.copy()
+    tracemalloc.start()
+    fn(image)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return float(np.median(timings)), peak, result
+
+
+def main(repeats=20, loop_repeats=1):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(1080, 1920, 3), dtype=np.uint8)
+    x, y = 560, 390
+
+    print(f"{'glasses':>10} {'method':>12} {'ms':>10} {'speedup':>8} {'temp MB':>8} {'max diff':>8}")
+    for width, height in [(300, 112), (800, 300)]:
+        glasses = cv2.resize(make_glasses(), (width, height), interpolation=cv2.INTER_AREA)
+        loop_time, loop_peak, reference = timed(lambda im: loop_blend(im, glasses, x, y), base, loop_repeats)
+        float_time, float_peak, float_result = timed(lambda im: float_blend(im, glasses, x, y), base, repeats)
+        fixed_time, fixed_peak, fixed_result = timed(lambda im: alpha_blend(im, glasses, x, y), base, repeats)
+
+        label = f"{width}x{height}"
+        rows = [
+            ('loop', loop_time, loop_peak, reference),
+            ('float64', float_time, float_peak, float_result),
+            ('fixed u16', fixed_time, fixed_peak, fixed_result)
+        ]
+        for name, seconds, peak, result in rows:
+            diff = int(np.abs(result.astype(np.int16) - reference.astype(np.int16)).max())
+            print(f"{label:>10} {name:>12} {seconds * 1000:10.2f} {loop_time / seconds:8.1f} "
+                  f"{peak / 2**20:8.2f} {diff:8d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
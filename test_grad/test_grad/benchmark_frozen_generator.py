@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import torch
+from app.models.model_loader import ModelArchitecture
+from app.models.frozen_generator import build_frozen_generator, load_frozen_generator
+
+# Input sizes (height, width) as produced by Resize(256) on common photos
+SHAPES = [(256, 256), (256, 341), (341, 256)]
+
+
+def measure(model, x, repeats):
+    """Median seconds per forward pass after two warm-up runs"""
+    timings = []
+    with torch.no_grad():
+        for _ in range(2):
+            model(x)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            output = model(x)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2], output
+
+
+def main(checkpoint_path, repeats=10):
+    eager = ModelArchitecture()
+    eager.load_state_dict(torch.load(checkpoint_path, map_location='cpu'))
+    eager.eval()
+
+    frozen = load_frozen_generator(checkpoint_path)
+    if frozen is None:
+        print(f"Building frozen artifact: {build_frozen_generator(checkpoint_path)}")
+        frozen = load_frozen_generator(checkpoint_path)
+
+    print(f"CPU threads: {torch.get_num_threads()}")
+    print(f"{'input':>10} {'eager ms':>10} {'frozen ms':>10} {'speedup':>8} {'max diff':>10}")
+    for height, width in SHAPES:
+        x = torch.randn(1, 3, height, width)
+        eager_time, eager_out = measure(eager, x, repeats)
+        frozen_time, frozen_out = measure(frozen, x, repeats)
+        diff = (eager_out - frozen_out).abs().max().item()
+        print(f"{f'{width}x{height}':>10} {eager_time * 1000:10.1f} {frozen_time * 1000:10.1f} "
+              f"{eager_time / frozen_time:8.2f} {diff:10.2e}")
+
+
+if __name__ == "__main__":
+    default_checkpoint = os.path.join(os.path.dirname(os.path.abspath(__file__)), '83_net_G_A.pth')
+    main(sys.argv[1] if len(sys.argv) > 1 else default_checkpoint,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,86 @@
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+import mediapipe as mp
+from app.utils.face_mesh_detector import (
+    DEFAULT_MAX_EDGE,
+    decode_image,
+    detect_landmarks,
+    landmarks_to_pixels
+)
+
+# Megapixel sizes to benchmark, as (width, height)
+RESOLUTIONS = [
+    (1280, 960),
+    (2048, 1536),
+    (3024, 4032),
+    (4000, 3000),
+    (6000, 4000)
+]
+
+
+def measure(fn, repeats):
+    """Return (median seconds, peak traced bytes, last result) for fn"""
+    timings = []
+    peak = 0
+    result = None
+    for _ in range(repeats):
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return float(np.median(timings)), peak, result
+
+
+def benchmark(image_path, max_edge=DEFAULT_MAX_EDGE, repeats=5):
+    """Compare full-resolution and bounded FaceMesh detection per resolution"""
+    source = cv2.imread(image_path)
+    if source is None:
+        raise ValueError(f"Could not read image from {image_path}")
+
+    face_mesh = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        min_detection_confidence=0.5
+    )
+
+    print(f"{'resolution':>12} {'mode':>8} {'decode+detect ms':>17} {'peak MB':>8} {'max err px':>10}")
+    for width, height in RESOLUTIONS:
+        image = cv2.resize(source, (width, height), interpolation=cv2.INTER_CUBIC)
+        _, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        data = encoded.tobytes()
+
+        def full():
+            decoded, _ = decode_image(data)
+            return detect_landmarks(face_mesh, decoded, max_edge=None)
+
+        def bounded():
+            decoded, _ = decode_image(data, max_edge)
+            return detect_landmarks(face_mesh, decoded, max_edge)
+
+        full_time, full_peak, full_points = measure(full, repeats)
+        bounded_time, bounded_peak, bounded_points = measure(bounded, repeats)
+
+        error = float('nan')
+        if full_points is not None and bounded_points is not None:
+            size = (height, width)
+            error = np.abs(
+                landmarks_to_pixels(full_points, size)[:, :2] -
+                landmarks_to_pixels(bounded_points, size)[:, :2]
+            ).max()
+
+        label = f"{width}x{height}"
+        print(f"{label:>12} {'full':>8} {full_time * 1000:17.1f} {full_peak / 2**20:8.1f} {'':>10}")
+        print(f"{label:>12} {'bounded':>8} {bounded_time * 1000:17.1f} {bounded_peak / 2**20:8.1f} {error:10.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_landmark_detection.py <face_image> [max_edge]")
+        sys.exit(1)
+
+    benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_EDGE)
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+import torch
+from app.models.model_loader import ModelArchitecture
+from app.models.precision import (
+    DEFAULT_CALIBRATION_DIR,
+    IMAGE_EXTENSIONS,
+    PRECISIONS,
+    bf16_supported,
+    load_generator_with_precision,
+    preprocess
+)
+
+
+def to_uint8(output):
+    """Generator output (1, 3, H, W) in [-1, 1] -> RGB uint8 image"""
+    image = (output[0].float().numpy().transpose(1, 2, 0) + 1) / 2.0 * 255.0
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def psnr(reference, image):
+    mse = np.mean((reference.astype(np.float64) - image.astype(np.float64)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def ssim(reference, image):
+    """Mean SSIM over channels with the standard 11x11, sigma 1.5 Gaussian window"""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    scores = []
+    for channel in range(reference.shape[2]):
+        x = reference[:, :, channel].astype(np.float64)
+        y = image[:, :, channel].astype(np.float64)
+        blur = lambda a: cv2.GaussianBlur(a, (11, 11), 1.5)
+        mu_x, mu_y = blur(x), blur(y)
+        var_x = blur(x * x) - mu_x ** 2
+        var_y = blur(y * y) - mu_y ** 2
+        cov = blur(x * y) - mu_x * mu_y
+        score = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+        scores.append(score.mean())
+    return float(np.mean(scores))
+
+
+def load_inputs(image_dir, limit):
+    """Evaluation images, taken from the end of the directory listing so they
+    overlap the calibration set (the first images) as little as possible"""
+    paths = sorted(p for p in os.listdir(image_dir) if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS)
+    inputs = []
+    for name in reversed(paths):
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is not None:
+            inputs.append(preprocess(image))
+        if len(inputs) >= limit:
+            break
+    return inputs
+
+
+def main(checkpoint_path, image_dir=DEFAULT_CALIBRATION_DIR, limit=8):
+    inputs = load_inputs(image_dir, limit)
+    print(f"{len(inputs)} evaluation images, {torch.get_num_threads()} threads, "
+          f"native bf16: {bf16_supported()}")
+
+    references = None
+    print(f"{'mode':>6} {'median ms':>10} {'speedup':>8} {'PSNR dB':>8} {'SSIM':>7}")
+    baseline = None
+    for precision in PRECISIONS:
+        model, used = load_generator_with_precision(checkpoint_path, ModelArchitecture, precision)
+        if used != precision:
+            print(f"{precision:>6} unavailable on this host")
+            continue
+
+        outputs, timings = [], []
+        with torch.no_grad():
+            model(inputs[0])
+            for x in inputs:
+                started = time.perf_counter()
+                output = model(x)
+                timings.append(time.perf_counter() - started)
+                outputs.append(to_uint8(output))
+        median = float(np.median(timings))
+
+        if references is None:
+            references, baseline = outputs, median
+        psnrs = [psnr(r, o) for r, o in zip(references, outputs)]
+        ssims = [ssim(r, o) for r, o in zip(references, outputs)]
+        print(f"{precision:>6} {median * 1000:10.1f} {baseline / median:8.2f} "
+              f"{np.mean(psnrs):8.2f} {np.mean(ssims):7.4f}")
+
+
+if __name__ == "__main__":
+    default_checkpoint = os.path.join(os.path.dirname(os.path.abspath(__file__)), '83_net_G_A.pth')
+    main(sys.argv[1] if len(sys.argv) > 1 else default_checkpoint,
+         sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CALIBRATION_DIR,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 8)
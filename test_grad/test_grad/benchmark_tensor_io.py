@@ -0,0 +1,69 @@
+import sys
+import time
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from app.models.tensor_io import bgr_to_nchw, bgr_to_tensor, nchw_to_bgr
+
+# (height, width): a generator input after Resize(256), and full-size photos
+SHAPES = [(256, 256), (256, 341), (1080, 1440), (2160, 3840)]
+
+TRANSFORM = transforms.Compose([
+    transforms.ToTensor(),
+    transforms.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
+])
+
+
+def pil_preprocess(image_bgr):
+    """The previous ModelLoader path: cvtColor -> PIL -> ToTensor -> Normalize"""
+    return TRANSFORM(Image.fromarray(cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB))).unsqueeze(0)
+
+
+def pil_postprocess(output):
+    """The previous ModelLoader path: clamp -> permute -> numpy -> cvtColor"""
+    output = torch.clamp((output.cpu().squeeze() + 1) / 2.0, 0, 1)
+    image = (output.permute(1, 2, 0).numpy() * 255).astype(np.uint8)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+def measure(fn, *args, repeats=20):
+    """Median milliseconds per call after a warm-up call"""
+    fn(*args)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main(repeats=20):
+    rng = np.random.default_rng(0)
+    print(f"CPU threads: {torch.get_num_threads()}")
+    print(f"{'input':>11} {'step':>5} {'PIL ms':>8} {'fused ms':>9} {'reused ms':>10} {'speedup':>8} {'max diff':>9}")
+    for height, width in SHAPES:
+        image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        # tanh-range output, as the generator produces
+        output = torch.from_numpy(rng.uniform(-1, 1, size=(1, 3, height, width)).astype(np.float32))
+        label = f"{height}x{width}"
+
+        in_buffer = np.empty((1, 3, height, width), np.float32)
+        before = measure(pil_preprocess, image, repeats=repeats)
+        after = measure(bgr_to_tensor, image, repeats=repeats)
+        reused = measure(bgr_to_nchw, image, in_buffer, repeats=repeats)
+        diff = (bgr_to_tensor(image) - pil_preprocess(image)).abs().max().item()
+        print(f"{label:>11} {'pre':>5} {before:8.2f} {after:9.2f} {reused:10.2f} {before / reused:8.2f} {diff:9.1e}")
+
+        out_buffer = np.empty((height, width, 3), np.uint8)
+        before = measure(pil_postprocess, output, repeats=repeats)
+        after = measure(nchw_to_bgr, output, repeats=repeats)
+        reused = measure(nchw_to_bgr, output, out_buffer, repeats=repeats)
+        diff = np.abs(nchw_to_bgr(output).astype(np.int16) - pil_postprocess(output)).max()
+        print(f"{label:>11} {'post':>5} {before:8.2f} {after:9.2f} {reused:10.2f} {before / reused:8.2f} {diff:9d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,110 @@
+"""Parity checks for the ONNX generator runtime against the torch generator
+
+Uses 83_net_G_A.pth when present, otherwise a randomly initialised
+generator. Run with pytest or directly: python test_onnx_generator.py
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+import torch
+from app.models.resnet_generator import ResnetGenerator
+from app.models.onnx_generator import OnnxGenerator, export_onnx, to_image, to_input
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT = os.path.join(SCRIPT_DIR, '83_net_G_A.pth')
+
+_fixture = {}
+
+
+def _setup():
+    """Export once per session; returns (torch model, onnx path, work dir)"""
+    if not _fixture:
+        work_dir = tempfile.mkdtemp()
+        checkpoint = CHECKPOINT
+        if not os.path.exists(checkpoint):
+            torch.manual_seed(0)
+            checkpoint = os.path.join(work_dir, 'random_G_A.pth')
+            torch.save(ResnetGenerator().state_dict(), checkpoint)
+
+        model = ResnetGenerator()
+        model.load_state_dict(torch.load(checkpoint, map_location='cpu'))
+        model.eval()
+        _fixture.update(model=model, onnx_path=export_onnx(checkpoint, artifact_dir=work_dir),
+                        work_dir=work_dir)
+    return _fixture['model'], _fixture['onnx_path'], _fixture['work_dir']
+
+
+def _runtimes():
+    runtimes = ['cv2']
+    try:
+        import onnxruntime  # noqa: F401
+        runtimes.append('onnxruntime')
+    except ImportError:
+        print("onnxruntime not installed, only checking cv2.dnn")
+    return runtimes
+
+
+def test_tensor_parity():
+    model, onnx_path, _ = _setup()
+    rng = np.random.default_rng(0)
+    for runtime in _runtimes():
+        generator = OnnxGenerator(onnx_path, runtime)
+        # Dynamic height/width (and batch for onnxruntime)
+        shapes = [(1, 3, 256, 256), (1, 3, 256, 340)]
+        if runtime == 'onnxruntime':
+            shapes.append((2, 3, 200, 256))
+        for shape in shapes:
+            x = rng.uniform(-1, 1, size=shape).astype(np.float32)
+            with torch.no_grad():
+                expected = model(torch.from_numpy(x)).numpy()
+            actual = generator(x)
+            diff = np.abs(actual - expected).max()
+            assert diff < 1e-4, f"{runtime} {shape}: max diff {diff}"
+
+
+def test_image_parity():
+    """uint8 output of the numpy pipeline vs the torchvision pipeline, resize included"""
+    import torchvision.transforms as transforms
+    from PIL import Image
+    model, onnx_path, _ = _setup()
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, size=(300, 400, 3), dtype=np.uint8)
+
+    transform = transforms.Compose([
+        transforms.Resize(256),
+        transforms.ToTensor(),
+        transforms.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
+    ])
+    tensor = transform(Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))).unsqueeze(0)
+    with torch.no_grad():
+        expected = model(tensor)[0].numpy()
+    expected = ((np.transpose(expected, (1, 2, 0)) + 1) / 2.0 * 255.0).astype(np.uint8)
+
+    for runtime in _runtimes():
+        actual = to_image(OnnxGenerator(onnx_path, runtime)(to_input(image, 256)))
+        assert actual.shape == expected.shape, f"{runtime}: shape {actual.shape} != {expected.shape}"
+        diff = np.abs(actual.astype(np.int16) - expected).max()
+        # Truncation to uint8 can flip a value sitting on an integer boundary
+        assert diff <= 1, f"{runtime}: max pixel diff {diff}"
+
+
+def test_runtime_does_not_import_torch():
+    _, onnx_path, _ = _setup()
+    code = (
+        "import sys, numpy as np\n"
+        "from app.models.onnx_generator import OnnxGenerator\n"
+        "from app.utils.glasses_style_transfer import GlassesStyleTransfer\n"
+        f"OnnxGenerator({str(onnx_path)!r})(np.zeros((1, 3, 64, 64), np.float32))\n"
+        "assert 'torch' not in sys.modules, 'torch was imported'\n"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR, check=True)
+
+
+if __name__ == "__main__":
+    test_tensor_parity()
+    test_image_parity()
+    test_runtime_does_not_import_torch()
+    print("ONNX generator matches torch")
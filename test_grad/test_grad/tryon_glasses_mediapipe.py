@@ -1,42 +1,48 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import os
+from app.utils.face_mesh_detector import DEFAULT_MAX_EDGE, detect_landmarks, landmarks_to_pixels
+from app.utils.face_mesh_pool import get_face_mesh_pool
+from app.utils.compositing import alpha_blend
+from app.utils.asset_cache import get_asset_cache
+from app.utils.sprite_cache import get_sprite_cache
 
-def overlay_glasses(image_path, glasses_path, output_path):
-    # Initialize MediaPipe Face Mesh
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(
-        static_image_mode=True,
-        max_num_faces=1,
-        min_detection_confidence=0.5
-    )
+def build_glasses_sprite(glasses_path, width, angle_deg):
+    """Resize glasses to width (keeping aspect ratio) and rotate by angle_deg"""
+    glasses = get_asset_cache().get(glasses_path)
+    if glasses is None:
+        raise ValueError(f"Could not read glasses image from {glasses_path}")
+    
+    aspect_ratio = glasses.shape[1] / glasses.shape[0]
+    height = int(width / aspect_ratio)
+    glasses_resized = cv2.resize(glasses, (width, height))
+    
+    center = (width // 2, height // 2)
+    rotation_matrix = cv2.getRotationMatrix2D(center, angle_deg, 1.0)
+    return cv2.warpAffine(glasses_resized, rotation_matrix, (width, height))
 
+def overlay_glasses(image_path, glasses_path, output_path, max_edge=DEFAULT_MAX_EDGE):
     # Read the input image and glasses image
     image = cv2.imread(image_path)
     if image is None:
         raise ValueError(f"Could not read image from {image_path}")
     
-    # Convert BGR to RGB for MediaPipe
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Get face landmarks
-    results = face_mesh.process(rgb_image)
+    # Get face landmarks from a bounded-resolution copy on a pooled FaceMesh
+    with get_face_mesh_pool().checkout() as face_mesh:
+        landmarks = detect_landmarks(face_mesh, image, max_edge)
     
-    if not results.multi_face_landmarks:
+    if landmarks is None:
         raise ValueError("No face detected in the image")
     
-    # Get left and right eye landmarks (33 is right eye, 263 is left eye)
-    face_landmarks = results.multi_face_landmarks[0]
-    right_eye = face_landmarks.landmark[33]
-    left_eye = face_landmarks.landmark[263]
-    
     # Get image dimensions
     img_height, img_width = image.shape[:2]
     
-    # Convert normalized coordinates to pixel coordinates
-    right_eye_px = (int(right_eye.x * img_width), int(right_eye.y * img_height))
-    left_eye_px = (int(left_eye.x * img_width), int(left_eye.y * img_height))
+    # Map landmarks back to full-resolution pixel coordinates
+    landmarks = landmarks_to_pixels(landmarks, (img_height, img_width))
+    
+    # Get left and right eye landmarks (33 is right eye, 263 is left eye)
+    right_eye_px = (int(landmarks[33, 0]), int(landmarks[33, 1]))
+    left_eye_px = (int(landmarks[263, 0]), int(landmarks[263, 1]))
     
     # Calculate eye distance for glasses sizing
     eye_distance = np.sqrt(
@@ -44,11 +50,6 @@ def overlay_glasses(image_path, glasses_path, output_path):
         (left_eye_px[1] - right_eye_px[1])**2
     )
     
-    # Read glasses image with alpha channel
-    glasses = cv2.imread(glasses_path, cv2.IMREAD_UNCHANGED)
-    if glasses is None:
-        raise ValueError(f"Could not read glasses image from {glasses_path}")
-    
     # Calculate angle between eyes for rotation
     angle_rad = np.arctan2(
         left_eye_px[1] - right_eye_px[1],
@@ -56,19 +57,17 @@ def overlay_glasses(image_path, glasses_path, output_path):
     )
     angle_deg = np.degrees(angle_rad)
     
-    # Calculate desired width of glasses (1.5x eye distance for better fit)
-    desired_width = int(eye_distance * 1.5)
-    aspect_ratio = glasses.shape[1] / glasses.shape[0]
-    desired_height = int(desired_width / aspect_ratio)
-    
-    # Resize glasses
-    glasses_resized = cv2.resize(glasses, (desired_width, desired_height))
-    
-    # Rotate glasses
-    center = (desired_width // 2, desired_height // 2)
-    rotation_matrix = cv2.getRotationMatrix2D(center, angle_deg, 1.0)
-    glasses_rotated = cv2.warpAffine(glasses_resized, rotation_matrix, 
-                                   (desired_width, desired_height))
+    # Resized and rotated glasses (1.5x eye distance for better fit); nearby
+    # widths and angles share one cached sprite, so repeat fits skip resampling
+    try:
+        glasses_key = get_asset_cache().version(glasses_path)
+    except OSError:
+        raise ValueError(f"Could not read glasses image from {glasses_path}")
+    glasses_rotated = get_sprite_cache().get_or_build(
+        glasses_key, eye_distance * 1.5, angle_deg,
+        lambda width, angle: build_glasses_sprite(glasses_path, width, angle)
+    )
+    desired_height, desired_width = glasses_rotated.shape[:2]
     
     # Calculate position to place glasses
     center_x = (left_eye_px[0] + right_eye_px[0]) // 2
@@ -78,28 +77,8 @@ def overlay_glasses(image_path, glasses_path, output_path):
     x_offset = int(center_x - desired_width // 2)
     y_offset = int(center_y - desired_height // 2)
     
-    # Create overlay
-    for y in range(glasses_rotated.shape[0]):
-        for x in range(glasses_rotated.shape[1]):
-            if (y_offset + y < 0 or y_offset + y >= img_height or 
-                x_offset + x < 0 or x_offset + x >= img_width):
-                continue
-                
-            # Get the alpha value from the glasses image
-            alpha = glasses_rotated[y, x, 3] / 255.0 if glasses_rotated.shape[2] == 4 else 1.0
-            
-            if alpha > 0:  # Only process pixels that aren't fully transparent
-                # Get the RGB values from the glasses
-                overlay_color = glasses_rotated[y, x, :3]
-                
-                # Get the original image color at this position
-                original_color = image[y_offset + y, x_offset + x]
-                
-                # Blend the colors based on alpha
-                blended_color = (1 - alpha) * original_color + alpha * overlay_color
-                
-                # Update the pixel in the original image
-                image[y_offset + y, x_offset + x] = blended_color
+    # Alpha-blend the glasses in one vectorized pass, clipped to the image
+    alpha_blend(image, glasses_rotated, x_offset, y_offset)
     
     # Save the result
     output_dir = os.path.dirname(output_path)